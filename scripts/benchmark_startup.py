@@ -0,0 +1,79 @@
+import argparse
+import os
+import subprocess
+import sys
+import numpy as np
+import pandas as pd
+
+# Import cost of the modules every simulation subprocess and pool worker loads.
+# Each import runs in a fresh interpreter so nothing is already in sys.modules.
+
+MODULES = [
+    "numpy",
+    "pandas",
+    "geopandas",
+    "sensors.core",
+    "sensors.typical_sensor",
+    "sensors.universal_sensor",
+    "utils.run_cache",
+    "utils.run_metrics",
+    "scripts.run_simulation",
+]
+REPEATS = int(os.getenv("STARTUP_REPEATS", 5))
+HEAVY_MODULES = ["geopandas", "shapely", "scipy", "matplotlib"]  # should not load with the core
+OUTPUT_CSV = "results/startup_benchmark.csv"
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_PROBE = """
+import sys, time
+t = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - t
+heavy = [m for m in {heavy!r} if m in sys.modules]
+print(elapsed, ",".join(heavy))
+"""
+
+
+def time_import(module, repeats=REPEATS):
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [REPO_ROOT, os.getenv("PYTHONPATH")])))
+    samples, heavy = [], ""
+    for _ in range(repeats):
+        out = subprocess.run([sys.executable, "-c", _PROBE.format(module=module, heavy=HEAVY_MODULES)],
+                             env=env, cwd=REPO_ROOT, check=True, capture_output=True, text=True).stdout.split()
+        samples.append(float(out[0]))
+        heavy = out[1] if len(out) > 1 else ""
+    return {"module": module, "median_s": np.median(samples), "min_s": min(samples), "max_s": max(samples),
+            "heavy_loaded": heavy}
+
+
+def top_imports(module, n=15):
+    # Largest cumulative entries from python -X importtime
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [REPO_ROOT, os.getenv("PYTHONPATH")])))
+    err = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                         env=env, cwd=REPO_ROOT, check=True, capture_output=True, text=True).stderr
+    rows = []
+    for line in err.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append({"package": name.strip(), "self_s": int(self_us) / 1e6, "cumulative_s": int(cumulative_us) / 1e6})
+    return pd.DataFrame(rows).sort_values("cumulative_s", ascending=False).head(n)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure import time of the simulation entry points")
+    parser.add_argument("modules", nargs="*", default=MODULES)
+    parser.add_argument("--repeats", type=int, default=REPEATS)
+    parser.add_argument("--profile", help="also list the slowest imports pulled in by this module")
+    args = parser.parse_args()
+
+    results = pd.DataFrame([time_import(m, args.repeats) for m in args.modules])
+    print(results.to_string(index=False, float_format=lambda v: f"{v:.3f}"))
+    os.makedirs(os.path.dirname(OUTPUT_CSV), exist_ok=True)
+    results.to_csv(OUTPUT_CSV, index=False)
+    print(f"\nStartup benchmark saved to {OUTPUT_CSV}")
+
+    if args.profile:
+        print(f"\nSlowest imports under {args.profile}:")
+        print(top_imports(args.profile).to_string(index=False, float_format=lambda v: f"{v:.3f}"))
@@ -0,0 +1,135 @@
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from scripts.run_simulation import (
+    run_simulation, load_grid, load_simulation_data, load_sensors, OUT_OF_CORE, SENSOR_CSV, SIM_GPKG
+)
+from sensors.spatial import map_sensors_to_cells
+from utils import run_cache
+from utils.schema import compact_simulation
+
+# Runs several scenarios (event file, time window, deployment) in one batch. Grids, fire
+# data and sensor-to-cell mappings are prepared once in the parent and inherited by the
+# worker processes; each scenario writes its own results/batch/<name>/ directory.
+#
+# Scenario file: a JSON list of
+#   {"name": "spread", "event": "data/simulation.gpkg", "start": "2016-05-03 00:00:00",
+#    "end": "2016-05-04 23:00:00", "sensors": "results/sensor_deployment.csv",
+#    "seed": 0, "params": {"KL_THRESHOLD": "1.5"}}
+# Only name, start and end are required. params may only set sensor parameters, which are
+# read when the sensors are built; everything else (MAC_MODE, SUPPRESSION, ...) is fixed
+# at import time and applies to the whole batch through the environment.
+
+SCENARIO_JSON = "scenarios.json"
+BATCH_DIR = os.getenv("BATCH_DIR", "results/batch")
+BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", os.cpu_count() or 1))
+SCENARIO_PARAMS = ["KL_THRESHOLD", "ERROR_HISTORY", "CONTROL_ERROR_THRESHOLD", "SAMPLING_RATE_MIN", "SAMPLING_RATE_MAX"]
+
+_shared = {}  # (event, sensors) -> state for run_simulation(shared=...), set in each worker
+
+
+def load_scenarios(path):
+    with open(path) as f:
+        scenarios = json.load(f)
+
+    names = set()
+    for scenario in scenarios:
+        scenario.setdefault("event", SIM_GPKG)
+        scenario.setdefault("sensors", SENSOR_CSV)
+        scenario.setdefault("seed", os.getenv("SIM_SEED"))
+        scenario.setdefault("params", {})
+        unknown = set(scenario["params"]) - set(SCENARIO_PARAMS)
+        if unknown:
+            raise ValueError(f"Scenario {scenario['name']!r}: {sorted(unknown)} can't vary per scenario; "
+                             f"set them in the environment for the whole batch")
+        if scenario["name"] in names:
+            raise ValueError(f"Duplicate scenario name {scenario['name']!r}")
+        names.add(scenario["name"])
+    return scenarios
+
+
+def prepare_shared(scenarios):
+    """Grid and fire data per event file, cell mapping per (event, deployment); each built once."""
+    events, shared = {}, {}
+    for scenario in scenarios:
+        event, sensors_csv = scenario["event"], scenario["sensors"]
+        if event not in events:
+            grid = load_grid(event)
+            sim_data = None if OUT_OF_CORE else compact_simulation(load_simulation_data(event, grid))
+            events[event] = {"grid": grid, "sim_data": sim_data}
+            run_cache.file_fingerprint(event)  # so workers only read the fingerprint index
+        if (event, sensors_csv) not in shared:
+            sensor_df = pd.read_csv(sensors_csv)
+            sensors = load_sensors(sensors_csv, sensor_df["x"].mean(), sensor_df["y"].mean())
+            cell_ids = map_sensors_to_cells([s.location for s in sensors], events[event]["grid"])
+            shared[(event, sensors_csv)] = {**events[event], "cell_ids": cell_ids}
+            run_cache.file_fingerprint(sensors_csv)
+    return shared
+
+
+def _init_worker(shared):
+    _shared.update(shared)
+
+
+def run_scenario(scenario):
+    output_dir = os.path.join(BATCH_DIR, scenario["name"])
+    os.makedirs(output_dir, exist_ok=True)
+
+    # Sensor parameters come from the environment; workers are reused, so restore it afterwards
+    saved = {name: os.environ.get(name) for name in scenario["params"]}
+    os.environ.update({name: str(value) for name, value in scenario["params"].items()})
+    try:
+        with open(os.path.join(output_dir, "run.log"), "w") as log, contextlib.redirect_stdout(log):
+            metrics = run_simulation(scenario["start"], scenario["end"], scenario["seed"], scenario["sensors"],
+                                     scenario["event"], output_dir, _shared[(scenario["event"], scenario["sensors"])])
+    finally:
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+    return metrics
+
+
+def comparison_tables(scenarios, results):
+    """Headline metrics per scenario, and the per-sensor-type summaries side by side."""
+    headline, by_type = [], []
+    for scenario, metrics in zip(scenarios, results):
+        info = {"scenario": scenario["name"], "event": scenario["event"], "start": scenario["start"],
+                "end": scenario["end"], "sensors": scenario["sensors"], "seed": scenario["seed"],
+                **scenario["params"]}
+        headline.append({**info, **metrics})
+        summary = pd.read_csv(os.path.join(BATCH_DIR, scenario["name"], "metrics", "summary_by_sensor_type.csv"))
+        by_type.append(summary.assign(scenario=scenario["name"]))
+    by_type = pd.concat(by_type, ignore_index=True)
+    by_type = by_type[["scenario"] + [c for c in by_type.columns if c != "scenario"]]
+    return pd.DataFrame(headline), by_type
+
+
+def run_batch(scenarios, workers=BATCH_WORKERS):
+    shared = prepare_shared(scenarios)
+    # fork lets workers inherit the prepared state instead of unpickling a copy each
+    context = multiprocessing.get_context("fork" if "fork" in multiprocessing.get_all_start_methods() else None)
+    with ProcessPoolExecutor(max_workers=min(workers, len(scenarios)), mp_context=context,
+                             initializer=_init_worker, initargs=(shared,)) as pool:
+        results = list(pool.map(run_scenario, scenarios))
+
+    headline, by_type = comparison_tables(scenarios, results)
+    headline.to_csv(os.path.join(BATCH_DIR, "comparison.csv"), index=False)
+    by_type.to_csv(os.path.join(BATCH_DIR, "comparison_by_sensor_type.csv"), index=False)
+    return headline
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run several simulation scenarios with shared grid and deployment state")
+    parser.add_argument("scenarios", nargs="?", default=SCENARIO_JSON, help="JSON list of scenarios")
+    parser.add_argument("--workers", type=int, default=BATCH_WORKERS)
+    args = parser.parse_args()
+
+    comparison = run_batch(load_scenarios(args.scenarios), args.workers)
+    print(comparison.to_string(index=False, float_format=lambda v: f"{v:.3f}"))
+    print(f"\nComparison saved to {os.path.join(BATCH_DIR, 'comparison.csv')}")
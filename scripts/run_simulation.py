@@ -1,17 +1,35 @@
 
-import geopandas as gpd
 import pandas as pd
+import numpy as np
 import os
-from shapely.geometry import Point
 from sensors.typical_sensor import TypicalSensor
 from sensors.universal_sensor import UniversalSensor
+from sensors.spatial import map_sensors_to_cells
+from utils import run_cache
+from utils.run_metrics import compute_run_metrics
+from utils.online_metrics import MetricsAggregator, METRICS_DIR, DIMENSIONS
+from utils.temporal_upsampling import upsampled_frames, SUBSTEPS_PER_HOUR
+from utils.stream_simulation import stream_frames
+from utils.battery import BatteryBank
+from utils.mac import UplinkChannel, MAC_MODE
+from utils.suppression import NeighborSuppression, SUPPRESSION
+from utils.schema import LogBuffer, compact_simulation, memory_mb, memory_report
+from utils.sensing_trace import TraceRecorder, SENSING_TRACE, WRITE_SENSING_TRACE
+from utils.live_stream import LiveFeed, LIVE_SOURCE, LIVE_TRANSMISSIONS
+from utils.terrain import terrain_link_loss, TERRAIN_PATH_LOSS
+from utils.link_adaptation import select_link_settings, link_settings, LINK_ADAPTATION
+from utils.path_loss import mean_path_loss_db
+from utils.phase_timer import PhaseTimer
 
-SENSOR_CSV = "results/sensor_deployment.csv"
-SIM_GPKG = "data/simulation.gpkg"
+SENSOR_CSV = os.getenv("SENSOR_CSV", "results/sensor_deployment.csv")  # e.g. results/sensor_deployment_optimized.csv
+SIM_GPKG = os.getenv("SIM_GPKG", "data/simulation.gpkg")  # event file; inherited by search/sweep runs
 SIM_LAYER = "fire_simulation_data"
 RESULT_CSV = "results/experiment_log_combined.csv"
 TRANSMISSION_CSV = "results/transmission_log_combined.csv"
+KL_TRACE_CSV = "results/kl_trace_universal.csv"  # per-reading surprise for threshold re-evaluation
 CRS = "EPSG:3978"
+OUT_OF_CORE = os.getenv("OUT_OF_CORE", "0") == "1"  # stream fire data in chunks instead of loading it all
+WRITE_RAW_LOGS = os.getenv("WRITE_RAW_LOGS", "1") != "0"  # 0: only the online metric tables are written
 
 def load_sensors(sensor_csv_path, base_x, base_y):
     df = pd.read_csv(sensor_csv_path)
@@ -28,94 +46,337 @@ def load_sensors(sensor_csv_path, base_x, base_y):
     return sensors
 
 
-def load_simulation_data():
-    fire_df = gpd.read_file(SIM_GPKG, layer=SIM_LAYER)
-    grid = gpd.read_file(SIM_GPKG, layer="grid_cells")
+def load_grid(sim_gpkg=SIM_GPKG):
+    import geopandas as gpd
 
-    fire_df["cell_id"] = fire_df["cell_id"].astype(int)
+    grid = gpd.read_file(sim_gpkg, layer="grid_cells")
     grid["cell_id"] = grid["cell_id"].astype(int)
-    grid = grid.to_crs(CRS)
+    return grid.to_crs(CRS)
+
+
+def load_simulation_data(sim_gpkg=SIM_GPKG, grid=None):
+    import geopandas as gpd  # deferred so cache hits return without loading the geospatial stack
+
+    fire_df = gpd.read_file(sim_gpkg, layer=SIM_LAYER)
+    fire_df["cell_id"] = fire_df["cell_id"].astype(int)
+    if grid is None:
+        grid = load_grid(sim_gpkg)
 
     sim_df = grid.merge(fire_df, on="cell_id")
     sim_df["datetime"] = pd.to_datetime(sim_df["datetime"])
     return sim_df
 
-def run_simulation():
-    os.makedirs("results", exist_ok=True)
+def output_paths(output_dir=None):
+    """Log and metric-table locations; output_dir=None keeps the standard results/ layout."""
+    if output_dir is None:
+        return {"experiment": RESULT_CSV, "transmission": TRANSMISSION_CSV, "kl_trace": KL_TRACE_CSV,
+                "sensing_trace": SENSING_TRACE, "live_transmissions": LIVE_TRANSMISSIONS, "metrics": METRICS_DIR}
+    return {"experiment": os.path.join(output_dir, os.path.basename(RESULT_CSV)),
+            "transmission": os.path.join(output_dir, os.path.basename(TRANSMISSION_CSV)),
+            "kl_trace": os.path.join(output_dir, os.path.basename(KL_TRACE_CSV)),
+            "sensing_trace": os.path.join(output_dir, os.path.basename(SENSING_TRACE)),
+            "live_transmissions": os.path.join(output_dir, os.path.basename(LIVE_TRANSMISSIONS)),
+            "metrics": os.path.join(output_dir, "metrics")}
+
+
+def run_simulation(start=None, end=None, seed=None, sensor_csv=SENSOR_CSV, sim_gpkg=SIM_GPKG,
+                   output_dir=None, shared=None, timer=None):
+    """Run one scenario and return its headline metrics.
+
+    start, end and seed default to SIM_START, SIM_END and SIM_SEED. shared may hold
+    state prepared once for several runs (see scripts/run_batch.py): "grid", "sim_data"
+    (compacted, in-memory mode) and "cell_ids" (map_sensors_to_cells for sensor_csv).
+    timer, a PhaseTimer, collects wall time per phase and the number of sensor steps.
+    """
+    shared = shared or {}
+    timer = timer if timer is not None else PhaseTimer()
+    paths = output_paths(output_dir)
+    result_csv, transmission_csv, kl_trace_csv = paths["experiment"], paths["transmission"], paths["kl_trace"]
+    metrics_dir = paths["metrics"]
+    os.makedirs(os.path.dirname(result_csv) or ".", exist_ok=True)
 
-    sensor_df = pd.read_csv(SENSOR_CSV)
+    start = pd.to_datetime(start if start is not None else os.getenv("SIM_START", "2016-05-01 00:00:00"))
+    end = pd.to_datetime(end if end is not None else os.getenv("SIM_END", "2016-05-08 23:00:00"))
+    seed = seed if seed is not None else os.getenv("SIM_SEED")
+
+    # Unseeded runs are not reproducible, so only seeded runs use the cache; nor are live feeds
+    cache_key = run_cache.run_key(sim_gpkg, sensor_csv, start, end, seed) \
+        if seed is not None and not LIVE_SOURCE else None
+    if cache_key is not None:
+        # Only the files this configuration writes; restore() clears those the cached run left out
+        # (the transmission log and KL trace are skipped when empty)
+        metric_tables = ["battery_timeline", "battery_summary", "memory_report"]
+        if MAC_MODE != "none":
+            metric_tables.append("mac_channel")
+        if SUPPRESSION:
+            metric_tables.append("suppression")
+        if TERRAIN_PATH_LOSS:
+            metric_tables.append("link_budget")
+        if LINK_ADAPTATION:
+            metric_tables.append("link_settings")
+        targets = {f"summary_by_{dim}": os.path.join(metrics_dir, f"summary_by_{dim}.csv") for dim in DIMENSIONS}
+        targets.update({name: os.path.join(metrics_dir, f"{name}.csv") for name in metric_tables})
+        if WRITE_RAW_LOGS:
+            targets.update({"experiment": result_csv, "transmission": transmission_csv, "kl_trace": kl_trace_csv})
+        if WRITE_SENSING_TRACE:
+            targets["sensing_trace"] = paths["sensing_trace"]
+        os.makedirs(metrics_dir, exist_ok=True)
+        metrics = run_cache.restore(cache_key, targets)
+        if metrics is not None:
+            print(f"Cache hit {cache_key[:16]}: logs restored to {result_csv} and {transmission_csv}")
+            return metrics
+
+    # Sampling decisions and path-loss shadowing both draw from np.random
+    if seed is not None:
+        np.random.seed(int(seed))
+
+    sensor_df = pd.read_csv(sensor_csv)
 
     base_x = sensor_df["x"].mean()
     base_y = sensor_df["y"].mean()
 
-    sensors = load_sensors(SENSOR_CSV, base_x, base_y)
+    sensors = load_sensors(sensor_csv, base_x, base_y)
+
+    # One spatial join for the fleet; each step then looks sensors' cells up by id
+    grid = shared.get("grid")
+    if grid is None:
+        grid = load_grid(sim_gpkg)
+    cell_ids = shared.get("cell_ids")
+    if cell_ids is None:
+        cell_ids = map_sensors_to_cells([s.location for s in sensors], grid)
+    for sensor, cell_id in zip(sensors, cell_ids):
+        sensor.cell_id = cell_id
+
+    # Diffraction loss of every sensor-to-base link, computed once per deployment and grid
+    link_budget = None
+    if TERRAIN_PATH_LOSS:
+        link_budget = terrain_link_loss([s.location for s in sensors], (base_x, base_y), grid)
+        for sensor, loss_db in zip(sensors, link_budget["diffraction_loss_db"]):
+            sensor.link_loss_db = float(loss_db)
+
+    # Bitrate and transmit power per link from its mean path loss (LINK_ADAPTATION=1)
+    link_table = None
+    if LINK_ADAPTATION:
+        xy = np.array([(s.location.x, s.location.y) for s in sensors])
+        path_loss = mean_path_loss_db(xy[:, 0], xy[:, 1], base_x, base_y,
+                                      excess_db=np.array([s.link_loss_db for s in sensors]))
+        link_table = select_link_settings(path_loss)
+        for sensor, radio in zip(sensors, link_settings(link_table)):
+            sensor.radio = radio
+
+    aggregator = MetricsAggregator(base_x, base_y)
+    for sensor in sensors:
+        sensor_type = "typical" if isinstance(sensor, TypicalSensor) else "universal"
+        aggregator.register_sensor(sensor.sensor_id, sensor_type, sensor.location.x, sensor.location.y)
+
+    # Per-sensor energy budget; dead sensors drop out of later steps (BATTERY_CAPACITY_J)
+    battery = BatteryBank(["typical" if isinstance(s, TypicalSensor) else "universal" for s in sensors])
+    channel = UplinkChannel(len(sensors), seed=None if seed is None else int(seed))
+    suppression = NeighborSuppression(
+        [(s.location.x, s.location.y) for s in sensors], [isinstance(s, UniversalSensor) for s in sensors]
+    ) if SUPPRESSION else None
+    # Universal sensors' observations for offline policy replay (WRITE_SENSING_TRACE=1)
+    recorder = TraceRecorder(base_x, base_y) if WRITE_SENSING_TRACE else None
 
-    sim_data = load_simulation_data()
+    timer.lap("setup")
 
-    start = pd.to_datetime(os.getenv("SIM_START", "2016-05-01 00:00:00"))
-    end = pd.to_datetime(os.getenv("SIM_END", "2016-05-08 23:00:00"))
+    memory_sizes = {}
+    live = None
+    substeps = SUBSTEPS_PER_HOUR
+    if LIVE_SOURCE:
+        # Frames are stepped as the feed delivers them; without look-ahead there is no interpolation
+        live = LiveFeed(LIVE_SOURCE, grid, paths["live_transmissions"])
+        substeps = 1
+    elif OUT_OF_CORE:
+        # Time-ordered chunks from the GeoPackage; memory is bounded by SIM_CHUNK_ROWS
+        frames = stream_frames(sim_gpkg, SIM_LAYER, grid, start, end)
+    else:
+        sim_data = shared.get("sim_data")
+        if sim_data is None:
+            sim_data = load_simulation_data(sim_gpkg, grid)
+            default_mb = memory_mb(sim_data)
+            sim_data = compact_simulation(sim_data)
+            memory_sizes = {"simulation_data": (len(sim_data), default_mb, memory_mb(sim_data))}
 
-    timesteps = sorted(sim_data["datetime"].unique())
-    timesteps = [ts for ts in timesteps if start <= ts <= end]
+        timesteps = sorted(sim_data["datetime"].unique())
+        timesteps = [ts for ts in timesteps if start <= ts <= end]
+        frames = (sim_data[sim_data["datetime"] == ts] for ts in timesteps)
 
-    logs = []
-    transmission_logs = []
+    # Log rows are compacted per step (COMPACT_SCHEMA)
+    logs = LogBuffer("experiment")
+    transmission_logs = LogBuffer("transmission")
+    kl_trace = LogBuffer("kl_trace")
+    timer.lap("load_data")
 
-    for timestep in timesteps:
-        timestep_df = sim_data[sim_data["datetime"] == timestep]
+    # SUBSTEPS_PER_HOUR > 1 interpolates extra frames between the hourly ones
+    previous = None
+    steps = live.frames() if live is not None else upsampled_frames(frames, substeps)
+    for timestep, timestep_df in steps:
+        timer.lap("frames")  # filtering, interpolation or waiting on the feed
+        hour = pd.Timestamp(timestep).floor("h")
+        step_hours = 1 / substeps if previous is None else (timestep - previous) / pd.Timedelta(hours=1)
+        previous = timestep
+        sensed = np.zeros(len(sensors), dtype=bool)
+        tx_mJ = np.zeros(len(sensors))
 
-        for sensor in sensors:
+        # Sense and decide what to send; the step's uplink traffic is scheduled together below
+        step_records = []
+        active = battery.active()
+        timer.count("sensor_steps", len(active))
+        for i in active:
+            sensor = sensors[i]
             if isinstance(sensor, TypicalSensor):
                 reading = sensor.read_from_simulation(timestep_df)
                 if reading is not None:
-                    logs.append({
-                        "sensor_id": sensor.sensor_id,
-                        "sensor_type": "typical",
-                        "datetime": timestep,
-                        "x": sensor.location.x,
-                        "y": sensor.location.y,
-                        "temperature": reading.get("temperature"),
-                        "wind_speed": reading.get("wind_speed"),
-                        "relative_humidity": reading.get("relative_humidity"),
-                        "hotspot": reading.get("hotspot"),
-                        "fwi": reading.get("fwi")
-                    })
-                    transmission = sensor.transmit()
-                    if transmission:
-                        transmission["sensor_type"] = "typical"
-                        transmission_logs.append(transmission)
+                    sensed[i] = True
+                    step_records.append((i, sensor, "typical", reading, sensor.transmit(), None))
 
             elif isinstance(sensor, UniversalSensor):
-                sensor.step(timestep_df)
+                sensed[i] = sensor.step(timestep_df) is not None
                 reading = sensor.readings.iloc[-1].to_dict() if not sensor.readings.empty else None
                 if reading is not None:
-                    logs.append({
+                    transmission = sensor.transmit()
+                    if recorder is not None and sensed[i]:
+                        recorder.add(sensor, timestep, reading, sensor.last_candidate)
+                    trace = {
+                        **(sensor.last_candidate or {}),
                         "sensor_id": sensor.sensor_id,
                         "sensor_type": "universal",
                         "datetime": timestep,
-                        "x": sensor.location.x,
-                        "y": sensor.location.y,
-                        "temperature": reading.get("temperature"),
-                        "wind_speed": reading.get("wind_speed"),
-                        "relative_humidity": reading.get("relative_humidity"),
                         "hotspot": reading.get("hotspot"),
-                        "fwi": reading.get("fwi")
-                    })
-                    transmission = sensor.transmit()
-                    if transmission:
-                        transmission["sensor_type"] = "universal"
-                        transmission_logs.append(transmission)
+                        "avg_kl": sensor.last_avg_kl
+                    } if WRITE_RAW_LOGS else None
+                    step_records.append((i, sensor, "universal", reading, transmission, trace))
+        timer.lap("sense")
+
+        # Universal sensors skip reports a neighbour already made this step (SUPPRESSION=1)
+        if suppression is not None:
+            candidates = [k for k, record in enumerate(step_records) if record[4]]
+            keep = suppression.apply(timestep, [step_records[k][0] for k in candidates],
+                                     [step_records[k][4] for k in candidates])
+            for k, kept in zip(candidates, keep):
+                if not kept:
+                    i, sensor, sensor_type, reading, _, trace = step_records[k]
+                    tx_mJ[i] += suppression.overhead_mJ  # listened, then stayed quiet
+                    step_records[k] = (i, sensor, sensor_type, reading, None, trace)
+
+        # Shared uplink: collisions, retries and queueing delay (MAC_MODE)
+        sending = [(i, transmission) for i, _, _, _, transmission, _ in step_records if transmission]
+        channel.schedule(timestep, step_hours, [t for _, t in sending], [i for i, _ in sending])
+        if suppression is not None:
+            # Kept reports listened too; charged after the MAC so retries don't repeat it
+            for i, transmission in sending:
+                if suppression.listens(i):
+                    transmission["energy_used_mJ"] += suppression.overhead_mJ
+        for _, _, _, _, transmission, trace in step_records:
+            if transmission and trace is not None and "mac_delivered" in transmission:
+                trace["mac_delivered"] = transmission["mac_delivered"]
+        timer.lap("uplink")
 
+        step_logs, step_transmissions, step_trace = [], [], []
+        for i, sensor, sensor_type, reading, transmission, trace in step_records:
+            if transmission:
+                tx_mJ[i] = transmission["energy_used_mJ"]
+            aggregator.record(sensor.sensor_id, hour, reading.get("hotspot"), transmission)
+            if transmission:
+                transmission["sensor_type"] = sensor_type
+            if not WRITE_RAW_LOGS:
+                continue
+            step_logs.append({
+                "sensor_id": sensor.sensor_id,
+                "sensor_type": sensor_type,
+                "datetime": timestep,
+                "x": sensor.location.x,
+                "y": sensor.location.y,
+                "temperature": reading.get("temperature"),
+                "wind_speed": reading.get("wind_speed"),
+                "relative_humidity": reading.get("relative_humidity"),
+                "hotspot": reading.get("hotspot"),
+                "fwi": reading.get("fwi")
+            })
+            if transmission:
+                step_transmissions.append(transmission)
+            if trace is not None:
+                step_trace.append(trace)
+        logs.extend(step_logs)
+        transmission_logs.extend(step_transmissions)
+        kl_trace.extend(step_trace)
+        if live is not None:
+            live.done(timestep, [t for _, t in sending])  # emitted as soon as the step is decided
+        timer.lap("log")
+
+        battery.drain(timestep, step_hours, sensed, tx_mJ)
         print(f"Timestep: {timestep} - Sensors updated")
+        timer.lap("battery")
+
+    # Summary tables from the online aggregator are always written
+    written = aggregator.save(metrics_dir)
+    written.update(battery.save(metrics_dir))
+    written.update(channel.save(metrics_dir))
+    if suppression is not None:
+        written.update(suppression.save(metrics_dir))
+        totals = suppression.table().sum(numeric_only=True)
+        print(f"Suppression: {int(totals['suppressed'])}/{int(totals['candidates'])} reports dropped, "
+              f"{totals['bytes_saved'] / 1024:.1f} KB saved, {int(totals['hotspot_reports_suppressed'])} hotspot reports dropped")
+    print(f"Metric summaries saved to {metrics_dir}")
+    if link_budget is not None:
+        written["link_budget"] = os.path.join(metrics_dir, "link_budget.csv")
+        link_budget.assign(sensor_id=[s.sensor_id for s in sensors]).to_csv(written["link_budget"], index=False)
+    if link_table is not None:
+        written["link_settings"] = os.path.join(metrics_dir, "link_settings.csv")
+        link_table.insert(0, "sensor_id", [s.sensor_id for s in sensors])
+        link_table.to_csv(written["link_settings"], index=False)
+    if live is not None:
+        written.update(live.save(metrics_dir))
+        print(f"Live feed: {live.summary()}")
+    if recorder:
+        written["sensing_trace"] = recorder.save(paths["sensing_trace"])
+        print(f"Sensing trace saved to {paths['sensing_trace']}")
+    metrics = aggregator.run_metrics()
+
+    if WRITE_RAW_LOGS:
+        # Save experiment results
+        exp_df = logs.frame()
+        exp_df.to_csv(result_csv, index=False)
+        print(f"Experiment log saved to {result_csv}")
+        written["experiment"] = result_csv
+
+        # Save the surprise trace used to evaluate other KL thresholds offline
+        if kl_trace:
+            kl_trace.frame().to_csv(kl_trace_csv, index=False)
+            written["kl_trace"] = kl_trace_csv
+
+        # Save transmission logs
+        if transmission_logs:
+            tx_df = transmission_logs.frame()
+            tx_df.to_csv(transmission_csv, index=False)
+            print(f"Transmission log saved to {transmission_csv}")
+            written["transmission"] = transmission_csv
+
+            # Headline metrics for universal sensors, kept with the logs in the run cache
+            metrics = compute_run_metrics(tx_df[tx_df["sensor_type"] == "universal"],
+                                          exp_df[exp_df["sensor_type"] == "universal"])
+
+    # Footprint of the compact schema against pandas defaults
+    if WRITE_RAW_LOGS:
+        memory_sizes.update({"experiment_log": logs.sizes(), "transmission_log": transmission_logs.sizes(),
+                             "kl_trace": kl_trace.sizes()})
+    report = memory_report(memory_sizes)
+    report.to_csv(os.path.join(metrics_dir, "memory_report.csv"), index=False)
+    written["memory_report"] = os.path.join(metrics_dir, "memory_report.csv")
+    print(report.to_string(index=False, float_format=lambda v: f"{v:.2f}"))
+
+    if battery.enabled:
+        lifetime = battery.summary().set_index("sensor_type")
+        if "universal" in lifetime.index:
+            metrics.update(lifetime.loc["universal", ["first_death_h", "half_life_h", "final_alive_fraction"]].to_dict())
 
-    # Save experiment results
-    pd.DataFrame(logs).to_csv(RESULT_CSV, index=False)
-    print(f"Experiment log saved to {RESULT_CSV}")
+    timer.lap("save")
 
-    # Save transmission logs
-    if transmission_logs:
-        pd.DataFrame(transmission_logs).to_csv(TRANSMISSION_CSV, index=False)
-        print(f"Transmission log saved to {TRANSMISSION_CSV}")
+    if cache_key is not None:
+        run_cache.store(cache_key, metrics, written,
+                        {"start": start, "end": end, "seed": seed, **run_cache.sensor_params_from_env()})
+    return metrics
 
 if __name__ == "__main__":
     run_simulation()
@@ -0,0 +1,120 @@
+import os
+import subprocess
+import numpy as np
+import pandas as pd
+from tqdm import tqdm
+from utils.detection_latency import load_hotspot_onsets
+from utils import run_cache
+from utils.run_metrics import load_run_logs, compute_run_metrics, RESULT_CSV, TRANSMISSION_CSV
+
+# Search space: environment variable read by UniversalSensor -> (low, high, scale)
+SEARCH_SPACE = {
+    "KL_THRESHOLD": (0.25, 3.0, "log"),
+    "ERROR_HISTORY": (5, 40, "int"),
+    "SAMPLING_RATE_MIN": (0.05, 0.5, "linear"),
+    "CONTROL_ERROR_THRESHOLD": (0.5, 4.0, "linear"),
+}
+
+SIM_START = os.getenv("SIM_START", "2016-05-02 23:00:00")
+SIM_END = os.getenv("SIM_END", "2016-05-06 23:00:00")
+SEARCH_SEED = int(os.getenv("SEARCH_SEED", 0))  # drives candidate sampling and every run's SIM_SEED
+N_CANDIDATES = int(os.getenv("SEARCH_CANDIDATES", 27))
+ETA = int(os.getenv("SEARCH_ETA", 3))  # keep the best 1/ETA at each rung
+MIN_WINDOW_HOURS = float(os.getenv("SEARCH_MIN_WINDOW_HOURS", 12))
+
+# Objective: minimise (or maximise) one metric subject to a floor on another
+OBJECTIVE_METRIC = os.getenv("OBJECTIVE_METRIC", "energy_j")
+OBJECTIVE_SENSE = os.getenv("OBJECTIVE_SENSE", "min")
+CONSTRAINT_METRIC = os.getenv("CONSTRAINT_METRIC", "hotspot_recovery_rate")
+CONSTRAINT_MIN = float(os.getenv("CONSTRAINT_MIN", 0.5))
+
+OUTPUT_DIR = "results/search_logs"
+SENSOR_CSV = os.getenv("SENSOR_CSV", "results/sensor_deployment.csv")
+
+
+def sample_candidates(rng, n):
+    candidates = []
+    for _ in range(n):
+        params = {}
+        for name, (low, high, scale) in SEARCH_SPACE.items():
+            if scale == "log":
+                params[name] = float(np.exp(rng.uniform(np.log(low), np.log(high))))
+            elif scale == "int":
+                params[name] = int(rng.integers(low, high + 1))
+            else:
+                params[name] = float(rng.uniform(low, high))
+        candidates.append(params)
+    return candidates
+
+
+def rung_windows(start, end, n_candidates):
+    # Successive halving: the last rung is the full window, each earlier one ETA times shorter
+    full_hours = (end - start) / pd.Timedelta(hours=1)
+    rungs = int(np.floor(np.log(n_candidates) / np.log(ETA))) if n_candidates > 1 else 0
+    hours = [max(MIN_WINDOW_HOURS, full_hours / ETA ** (rungs - r)) for r in range(rungs + 1)]
+    return [start + pd.Timedelta(hours=min(h, full_hours)) for h in hours]
+
+
+def score(metrics):
+    # Feasible runs rank by the objective; infeasible ones by how far they miss the floor
+    shortfall = CONSTRAINT_MIN - metrics[CONSTRAINT_METRIC]
+    if shortfall > 0:
+        return (1, shortfall)
+    value = metrics[OBJECTIVE_METRIC]
+    return (0, value if OBJECTIVE_SENSE == "min" else -value)
+
+
+def evaluate(params, start, end, onsets, sensors):
+    from scripts.run_simulation import SIM_GPKG
+
+    env = dict(os.environ, SIM_START=str(start), SIM_END=str(end), SIM_SEED=str(SEARCH_SEED), SENSOR_CSV=SENSOR_CSV)
+    env.update({name: str(value) for name, value in params.items()})
+
+    key = run_cache.run_key(SIM_GPKG, SENSOR_CSV, start, end, SEARCH_SEED,
+                            run_cache.sensor_params_from_env(env))
+    if run_cache.restore(key, {"experiment": RESULT_CSV, "transmission": TRANSMISSION_CSV}) is None:
+        subprocess.run(["python", "scripts/run_simulation.py"], env=env, check=True, stdout=subprocess.DEVNULL)
+
+    window_onsets = onsets[(onsets["onset_time"] >= start) & (onsets["onset_time"] <= end)]
+    tx_log, exp_log = load_run_logs()
+    return compute_run_metrics(tx_log, exp_log, window_onsets, sensors)
+
+
+def search():
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    rng = np.random.default_rng(SEARCH_SEED)
+    start, end = pd.to_datetime(SIM_START), pd.to_datetime(SIM_END)
+
+    sensor_df = pd.read_csv(SENSOR_CSV)
+    sensors = sensor_df[sensor_df["sensor_type"] == "universal"]
+    onsets = load_hotspot_onsets(start, end)
+
+    candidates = list(enumerate(sample_candidates(rng, N_CANDIDATES)))
+    windows = rung_windows(start, end, N_CANDIDATES)
+    history = []
+
+    for rung, window_end in enumerate(windows):
+        print(f"\nRung {rung}: {len(candidates)} candidates on {start} -> {window_end}")
+        scored = []
+        for cid, params in tqdm(candidates, desc=f"Rung {rung}", unit="config"):
+            metrics = evaluate(params, start, window_end, onsets, sensors)
+            history.append({"rung": rung, "window_end": window_end, "candidate": cid, **params, **metrics,
+                            "feasible": score(metrics)[0] == 0})
+            scored.append((score(metrics), cid, params))
+
+        # Stable ordering by score, then candidate id, keeps promotion reproducible
+        scored.sort(key=lambda item: (item[0], item[1]))
+        if rung < len(windows) - 1:
+            candidates = [(cid, params) for _, cid, params in scored[: max(1, len(scored) // ETA)]]
+
+    history_df = pd.DataFrame(history)
+    history_df.to_csv(os.path.join(OUTPUT_DIR, "search_history.csv"), index=False)
+
+    best_score, best_id, best_params = scored[0]
+    print(f"\nBest candidate {best_id} ({'feasible' if best_score[0] == 0 else 'infeasible'}): {best_params}")
+    print(f"Search history saved to {OUTPUT_DIR}/search_history.csv")
+    return best_params, history_df
+
+
+if __name__ == "__main__":
+    search()
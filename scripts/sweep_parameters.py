@@ -1,63 +1,86 @@
 import os
 import pandas as pd
 import subprocess
-from itertools import product
 from tqdm import tqdm  # ✅ Import progress bar
+from utils.detection_latency import load_hotspot_onsets
+from utils import run_cache
+from utils.run_metrics import RESULT_CSV, TRANSMISSION_CSV, load_run_logs, compute_run_metrics
+from utils.detection_latency import detection_latency, summarize_latency
+from utils.threshold_eval import (
+    load_kl_trace, evaluate_thresholds, transmission_log_for_threshold, threshold_feedback, KL_TRACE_CSV
+)
 
 # Parameters to sweep
 kl_thresholds = [0.5, 1.0, 1.5, 2.0]
 error_history_lengths = [5, 10, 20, 30]
+SENSOR_CSV = os.getenv("SENSOR_CSV", "results/sensor_deployment.csv")  # the deployment run_simulation.py reads
 
 os.environ["SIM_START"] = "2016-05-02 23:00:00"
 os.environ["SIM_END"] = "2016-05-06 23:00:00"
+os.environ.setdefault("SIM_SEED", "0")  # seeded runs can be served from the run cache
 
 # Create output directory for logs
 os.makedirs("results/sweep_logs", exist_ok=True)
 
-# Run simulations for each parameter pair with progress bar
+# Hotspot onsets and sensor positions are the same for every configuration
+onsets = load_hotspot_onsets(os.environ["SIM_START"], os.environ["SIM_END"])
+sensor_df = pd.read_csv(SENSOR_CSV)
+universal_sensors = sensor_df[sensor_df["sensor_type"] == "universal"]
+
+# KL_THRESHOLD only gates transmit(), so one run per history length yields every
+# threshold's results from its KL trace - unless batteries, the MAC or suppression
+# react to the traffic, in which case every threshold gets its own run
+feedback = threshold_feedback()
+if feedback:
+    print(f"{', '.join(feedback)} make results depend on the threshold beyond transmit(): one run per threshold")
 results = []
-sweep_combinations = list(product(kl_thresholds, error_history_lengths))
 
-for kl, history in tqdm(sweep_combinations, desc="Sweeping parameters", unit="config"):
-    # Print current run
-    print(f"\nRunning simulation for KL={kl}, history={history}")
 
-    # Define environment variables
-    os.environ["KL_THRESHOLD"] = str(kl)
-    os.environ["ERROR_HISTORY"] = str(history)
+def run_cached(targets):
+    # Run the simulation for the current environment, unless an identical run is already cached
+    from scripts.run_simulation import SIM_GPKG
 
-    # Run the simulation
-    subprocess.run(["python", "scripts/run_simulation.py"], check=True)
+    key = run_cache.run_key(SIM_GPKG, SENSOR_CSV,
+                            os.environ["SIM_START"], os.environ["SIM_END"], os.environ["SIM_SEED"])
+    if run_cache.restore(key, targets) is None:
+        subprocess.run(["python", "scripts/run_simulation.py"], check=True)
 
-    # Load transmission log
-    tx_log = pd.read_csv("results/transmission_log_combined.csv")
-    tx_log = tx_log[tx_log["sensor_type"] == "universal"]
 
-    # Metrics
-    transmissions = len(tx_log)
-    total_energy_j = tx_log["energy_used_mJ"].sum() / 1000
-    avg_sampling_rate = tx_log["sampling_rate"].mean()
+for history in tqdm(error_history_lengths, desc="Sweeping parameters", unit="config"):
+    # Print current run
+    print(f"\nRunning simulation for history={history} (KL thresholds {kl_thresholds})")
+    os.environ["ERROR_HISTORY"] = str(history)
 
-    # Hotspot recovery
-    exp_log = pd.read_csv("results/experiment_log_combined.csv")
-    exp_log = exp_log[exp_log["sensor_type"] == "universal"]
-    exp_log["key"] = exp_log["sensor_id"].astype(str) + "_" + exp_log["datetime"].astype(str)
-    tx_log["key"] = tx_log["sensor_id"].astype(str) + "_" + tx_log["timestamp"].astype(str)
-    exp_log["transmitted"] = exp_log["key"].isin(tx_log["key"])
+    if feedback:
+        for threshold in kl_thresholds:
+            os.environ["KL_THRESHOLD"] = str(threshold)
+            run_cached({"experiment": RESULT_CSV, "transmission": TRANSMISSION_CSV})
+            tx_log, exp_log = load_run_logs()
+            metrics = compute_run_metrics(tx_log, exp_log, onsets, universal_sensors)
+            results.append({"kl_threshold": threshold, "error_history": history, **metrics})
+        continue
 
-    hotspots = exp_log[exp_log["hotspot"] == 1]
-    hotspot_transmitted = hotspots["transmitted"].sum()
-    hotspot_total = len(hotspots)
-    hotspot_rate = hotspot_transmitted / hotspot_total if hotspot_total > 0 else 0
+    # The threshold is fixed so the cache key is shared
+    os.environ["KL_THRESHOLD"] = str(min(kl_thresholds))
+    run_cached({"experiment": RESULT_CSV, "transmission": TRANSMISSION_CSV, "kl_trace": KL_TRACE_CSV})
 
-    results.append({
-        "kl_threshold": kl,
-        "error_history": history,
-        "transmissions": transmissions,
-        "energy_j": total_energy_j,
-        "avg_sampling_rate": avg_sampling_rate,
-        "hotspot_recovery_rate": hotspot_rate
-    })
+    # Count/energy/recovery metrics for all thresholds at once, latency per threshold
+    trace = load_kl_trace()
+    for row in evaluate_thresholds(trace, kl_thresholds).to_dict("records"):
+        tx_log = transmission_log_for_threshold(trace, row["kl_threshold"])
+        latency = summarize_latency(detection_latency(onsets, universal_sensors, tx_log))
+        results.append({
+            "kl_threshold": row["kl_threshold"],
+            "error_history": history,
+            "transmissions": row["transmissions"],
+            "energy_j": row["energy_j"],
+            "avg_sampling_rate": row["avg_sampling_rate"],
+            "hotspot_recovery_rate": row["hotspot_recovery_rate"],
+            "detection_rate": latency["detection_rate"],
+            "latency_median_h": latency["latency_median_h"],
+            "latency_p90_h": latency["latency_p90_h"],
+            "missed_onsets": latency["missed"],
+        })
 
 # Save results
 sweep_df = pd.DataFrame(results)
@@ -0,0 +1,277 @@
+import argparse
+import contextlib
+import hashlib
+import json
+import multiprocessing
+import os
+import shutil
+import subprocess
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from utils import run_cache
+
+# Reference runs for tracking speed and results across commits. Each run uses a fixed
+# seed, window and deployment with the run cache and live feeds off, in a fresh
+# interpreter (so peak RSS is the run's own). It records wall time per phase, peak RSS,
+# sensor steps per second and result fingerprints to a history file; `compare` flags
+# slowdowns and result drift between two entries.
+#
+#   python -m scripts.track_performance run --label "vectorized sensing"
+#   python -m scripts.track_performance compare            # latest entry vs the one before
+#   python -m scripts.track_performance compare --base 1a2b3c4
+
+PERF_HISTORY = os.getenv("PERF_HISTORY", "results/perf_history.csv")
+PERF_RUN_DIR = "results/perf_run"  # scratch output of reference runs
+PERF_REPEATS = int(os.getenv("PERF_REPEATS", 3))  # timings are medians over repeats
+PERF_START = os.getenv("PERF_START", "2016-05-03 00:00:00")
+PERF_END = os.getenv("PERF_END", "2016-05-03 23:00:00")
+PERF_SEED = int(os.getenv("PERF_SEED", 0))
+SPEED_TOLERANCE = float(os.getenv("PERF_SPEED_TOLERANCE", 0.10))  # relative slowdown flagged as a regression
+MEMORY_TOLERANCE = float(os.getenv("PERF_MEMORY_TOLERANCE", 0.10))  # relative peak RSS growth
+MIN_PHASE_S = float(os.getenv("PERF_MIN_PHASE_S", 0.05))  # smaller absolute changes are timer noise
+DRIFT_TOLERANCE = float(os.getenv("PERF_DRIFT_TOLERANCE", 1e-9))  # relative change of a result fingerprint
+
+# Loop phases of run_simulation; the rest is setup, data loading and saving
+STEP_PHASES = ["frames", "sense", "uplink", "log", "battery"]
+# summary_by_sensor_type columns kept per sensor type (hotspot_coverage is hotspot recovery)
+FINGERPRINT_FIELDS = ["readings", "transmissions", "hotspot_transmissions", "data_bytes", "energy_mJ",
+                      "hotspot_coverage"]
+
+
+def file_digest(path):
+    if not os.path.exists(path):
+        return None
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()[:16]
+
+
+def result_fingerprint(paths):
+    """Per-type counts and energy totals, plus digests of the per-sensor summary and raw logs."""
+    summary = pd.read_csv(os.path.join(paths["metrics"], "summary_by_sensor_type.csv")).set_index("sensor_type")
+    fingerprint = {f"fp_{sensor_type}_{field}": float(row[field])
+                   for sensor_type, row in summary.iterrows() for field in FINGERPRINT_FIELDS}
+    fingerprint["fp_sensor_summary_sha"] = file_digest(os.path.join(paths["metrics"], "summary_by_sensor.csv"))
+    fingerprint["fp_transmission_log_sha"] = file_digest(paths["transmission"])
+    fingerprint["fp_experiment_log_sha"] = file_digest(paths["experiment"])
+    return fingerprint
+
+
+def reference_run(start, end, seed, sensor_csv, sim_gpkg, output_dir):
+    """One timed run in the current process; meant to be the only work a fresh worker does."""
+    import resource
+    from scripts.run_simulation import run_simulation, output_paths
+    from utils.phase_timer import PhaseTimer
+
+    shutil.rmtree(output_dir, ignore_errors=True)
+    timer = PhaseTimer()
+    with open(os.devnull, "w") as sink, contextlib.redirect_stdout(sink):
+        run_simulation(start, end, seed, sensor_csv, sim_gpkg, output_dir, timer=timer)
+
+    loop_s = sum(timer.seconds.get(phase, 0.0) for phase in STEP_PHASES)
+    steps = timer.counts.get("sensor_steps", 0)
+    return {
+        "wall_s": timer.total(),
+        **{f"phase_{phase}_s": seconds for phase, seconds in timer.seconds.items()},
+        "sensor_steps": steps,
+        "sensor_steps_per_s": steps / loop_s if loop_s > 0 else np.nan,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,  # KiB on Linux
+        **result_fingerprint(output_paths(output_dir)),
+    }
+
+
+def scenario_key(sim_gpkg, sensor_csv, start, end, seed):
+    # Like run_cache.run_key without the code: entries with equal keys must give equal results
+    spec = {
+        "simulation_input": run_cache.file_fingerprint(sim_gpkg),
+        "sensor_deployment": run_cache.file_fingerprint(sensor_csv),
+        "sensor_params": run_cache.sensor_params_from_env(),
+        "start": str(pd.Timestamp(start)),
+        "end": str(pd.Timestamp(end)),
+        "seed": int(seed),
+    }
+    return hashlib.sha256(json.dumps(spec, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def git_state():
+    def git(*args):
+        try:
+            return subprocess.run(["git", *args], cwd=run_cache.REPO_ROOT, capture_output=True, text=True,
+                                  check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+    commit = git("rev-parse", "--short", "HEAD")
+    status = git("status", "--porcelain", "--untracked-files=no")
+    return commit, None if status is None else bool(status)
+
+
+def track(label="", repeats=PERF_REPEATS, start=PERF_START, end=PERF_END, seed=PERF_SEED, sensor_csv=None,
+          sim_gpkg=None, history_path=PERF_HISTORY):
+    """Run the reference scenario repeats times and append one entry to the history file."""
+    from scripts.run_simulation import SENSOR_CSV, SIM_GPKG
+
+    sensor_csv = sensor_csv or SENSOR_CSV
+    sim_gpkg = sim_gpkg or SIM_GPKG
+    # Inherited by the workers, which import the simulation afresh
+    os.environ["RUN_CACHE"] = "0"
+    if os.environ.pop("LIVE_SOURCE", None):
+        print("LIVE_SOURCE ignored: reference runs replay the event file")
+
+    runs = []
+    context = multiprocessing.get_context("spawn")
+    for k in range(repeats):
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            runs.append(pool.submit(reference_run, start, end, seed, sensor_csv, sim_gpkg, PERF_RUN_DIR).result())
+        print(f"Run {k + 1}/{repeats}: {runs[-1]['wall_s']:.2f}s, "
+              f"{runs[-1]['sensor_steps_per_s']:.0f} sensor steps/s, {runs[-1]['peak_rss_mb']:.0f} MB")
+
+    runs = pd.DataFrame(runs)
+    timings = [c for c in runs.columns if c.endswith("_s") or c in ("peak_rss_mb", "sensor_steps_per_s")]
+    fingerprints = [c for c in runs.columns if c.startswith("fp_")]
+    deterministic = bool((runs[fingerprints].astype(str).nunique() == 1).all())
+    if not deterministic:
+        print("Warning: repeats gave different results; the reference run is not reproducible")
+
+    commit, dirty = git_state()
+    entry = {
+        "recorded_at": pd.Timestamp.now(tz="UTC").isoformat(timespec="seconds"),
+        "commit": commit, "dirty": dirty, "code_sha": run_cache.code_fingerprint()[:16], "label": label,
+        "scenario": scenario_key(sim_gpkg, sensor_csv, start, end, seed), "start": start, "end": end, "seed": seed,
+        "sensors": sensor_csv, "repeats": repeats, "deterministic": deterministic,
+        **runs[timings].median().to_dict(), "wall_min_s": runs["wall_s"].min(),
+        "sensor_steps": int(runs["sensor_steps"].iloc[0]),
+        **runs[fingerprints].iloc[0].to_dict(),
+    }
+
+    history = load_history(history_path)
+    history = pd.concat([history, pd.DataFrame([entry])], ignore_index=True) if not history.empty \
+        else pd.DataFrame([entry])
+    os.makedirs(os.path.dirname(history_path) or ".", exist_ok=True)
+    history.to_csv(history_path, index=False)
+    return entry
+
+
+def load_history(path=PERF_HISTORY):
+    if not os.path.exists(path):
+        return pd.DataFrame()
+    history = pd.read_csv(path, dtype={"commit": str, "code_sha": str, "label": str, "scenario": str})
+    return history.fillna({"label": ""})
+
+
+def select_entry(history, ref=None, before=None):
+    """Row position for ref: a negative index ("-1" latest), or the latest entry of a commit prefix.
+
+    With ref=None, the latest entry before position before with the same scenario.
+    """
+    if ref is None:
+        candidates = history.index[:before] if before is not None else history.index
+        if before is not None:
+            candidates = [k for k in candidates if history.at[k, "scenario"] == history.at[before, "scenario"]]
+        if len(candidates) == 0:
+            raise ValueError("No earlier entry of the same scenario to compare against")
+        return candidates[-1]
+    if ref.startswith("-") and ref[1:].isdigit():  # anything else, digits included, is a commit prefix
+        if int(ref[1:]) > len(history):
+            raise ValueError(f"Index {ref} is out of range for {len(history)} history entries")
+        return history.index[int(ref)]
+    matches = history.index[history["commit"].fillna("").str.startswith(ref)]
+    if len(matches) == 0:
+        raise ValueError(f"No history entry for commit {ref!r}")
+    return matches[-1]
+
+
+def compare(history, base, head, speed_tolerance=SPEED_TOLERANCE, memory_tolerance=MEMORY_TOLERANCE,
+            min_phase_s=MIN_PHASE_S, drift_tolerance=DRIFT_TOLERANCE):
+    """One row per tracked quantity with base and head values and a status.
+
+    Status is ok, faster, slower (beyond the speed or memory tolerance) or drift (a
+    fingerprint changed beyond drift_tolerance, or a digest changed).
+    """
+    b, h = history.loc[base], history.loc[head]
+    rows = []
+    for column in history.columns:
+        old, new = b[column], h[column]
+        if column.endswith("_s") or column in ("sensor_steps_per_s", "peak_rss_mb"):
+            if pd.isna(old) or pd.isna(new):
+                continue
+            change = new / old - 1 if old else np.nan
+            if column == "sensor_steps_per_s":  # higher is better
+                slower, faster = new < old / (1 + speed_tolerance), new > old * (1 + speed_tolerance)
+            elif column == "peak_rss_mb":
+                slower, faster = new > old * (1 + memory_tolerance), new < old / (1 + memory_tolerance)
+            else:
+                noticeable = abs(new - old) >= min_phase_s
+                slower = noticeable and new > old * (1 + speed_tolerance)
+                faster = noticeable and new < old / (1 + speed_tolerance)
+            status = "slower" if slower else "faster" if faster else "ok"
+        elif column.startswith("fp_"):
+            if pd.isna(old) and pd.isna(new):
+                continue
+            if column.endswith("_sha"):
+                change, status = np.nan, "ok" if old == new else "drift"
+            else:
+                change = new / old - 1 if old else np.nan
+                status = "ok" if np.isclose(new, old, rtol=drift_tolerance, atol=0) else "drift"
+        else:
+            continue
+        rows.append({"quantity": column, "base": old, "head": new, "change": change, "status": status})
+    return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Record reference-run performance and compare it across commits")
+    sub = parser.add_subparsers(dest="command", required=True)
+    run = sub.add_parser("run", help="time the reference scenario and append it to the history")
+    run.add_argument("--label", default="", help="note stored with the entry")
+    run.add_argument("--repeats", type=int, default=PERF_REPEATS)
+    run.add_argument("--start", default=PERF_START)
+    run.add_argument("--end", default=PERF_END)
+    run.add_argument("--seed", type=int, default=PERF_SEED)
+    run.add_argument("--sensors", help="deployment CSV (default: SENSOR_CSV)")
+    run.add_argument("--event", help="simulation GeoPackage (default: data/simulation.gpkg)")
+    cmp = sub.add_parser("compare", help="flag slowdowns and result drift between two entries")
+    cmp.add_argument("--base", help="commit prefix or negative index (default: previous entry of the head's scenario)")
+    cmp.add_argument("--head", default="-1", help="commit prefix or negative index (default: latest entry)")
+    cmp.add_argument("--all", action="store_true", help="list unchanged quantities too")
+    sub.add_parser("show", help="print the history")
+    for p in (run, cmp, sub.choices["show"]):
+        p.add_argument("--history", default=PERF_HISTORY)
+    args = parser.parse_args()
+
+    if args.command == "run":
+        t = time.perf_counter()
+        entry = track(args.label, args.repeats, args.start, args.end, args.seed, args.sensors, args.event, args.history)
+        print(f"Recorded {entry['commit']}{'+' if entry['dirty'] else ''} ({time.perf_counter() - t:.0f}s): "
+              f"median {entry['wall_s']:.2f}s, {entry['sensor_steps_per_s']:.0f} sensor steps/s, "
+              f"peak {entry['peak_rss_mb']:.0f} MB -> {args.history}")
+
+    elif args.command == "show":
+        history = load_history(args.history)
+        columns = ["recorded_at", "commit", "dirty", "label", "scenario", "wall_s", "sensor_steps_per_s", "peak_rss_mb",
+                   "deterministic"]
+        print(history[columns].to_string(float_format=lambda v: f"{v:.2f}"))
+
+    else:
+        history = load_history(args.history)
+        head = select_entry(history, args.head)
+        base = select_entry(history, args.base, before=history.index.get_loc(head))
+        same_scenario = history.at[base, "scenario"] == history.at[head, "scenario"]
+        report = compare(history, base, head)
+        if not same_scenario:
+            print("Entries ran different scenarios: result fingerprints are not comparable")
+            report = report[~report["quantity"].str.startswith("fp_")]
+        if not history.at[head, "deterministic"]:
+            print("Warning: the head entry's repeats disagreed; its results are not reproducible")
+
+        print(f"Base: {history.at[base, 'commit']} ({history.at[base, 'recorded_at']}) {history.at[base, 'label']}")
+        print(f"Head: {history.at[head, 'commit']} ({history.at[head, 'recorded_at']}) {history.at[head, 'label']}")
+        shown = report if args.all else report[report["status"] != "ok"]
+        print(shown.to_string(index=False, float_format=lambda v: f"{v:.4g}") if not shown.empty else "No changes")
+        flagged = report["status"].isin(["slower", "drift"])
+        print(f"{int((report['status'] == 'slower').sum())} regression(s), "
+              f"{int((report['status'] == 'drift').sum())} drifted result(s)")
+        raise SystemExit(1 if flagged.any() else 0)
@@ -0,0 +1,99 @@
+import json
+from datetime import datetime
+from typing import NamedTuple
+import numpy as np
+from utils.path_loss import compute_path_loss_db
+
+# Dependency-light sensor logic: NumPy and the standard library only, so sweep
+# subprocesses and pool workers can import it without geopandas/shapely/scipy.
+# Spatial joins live in sensors/spatial.py and are imported on first use.
+
+ENV_VARS = ["temperature", "wind_speed", "relative_humidity", "hotspot", "fwi"]
+PREDICTED_VARS = ("temperature", "wind_speed", "relative_humidity")
+
+
+class Location(NamedTuple):
+    x: float
+    y: float
+
+
+def kl_divergence_gaussians(mu_p, mu_q, sigma=1.0):
+    """KL(P‖Q): P = predicted, Q = observed"""
+    return (0.5 / sigma**2) * (mu_p - mu_q)**2
+
+
+def average_kl(predicted, observed, variables=PREDICTED_VARS, sigma=1.0):
+    # Mean KL surprise over the variables both sides have; None when nothing can be compared
+    if predicted is None or observed is None:
+        return None
+
+    total_kl = 0.0
+    count = 0
+    for var in variables:
+        if var in predicted and var in observed:
+            total_kl += kl_divergence_gaussians(predicted[var], observed[var], sigma)
+            count += 1
+
+    if count == 0:
+        return None
+    return total_kl / count
+
+
+def entropy_sampling_rate(error_history, max_history, min_rate, max_rate):
+    # Normalised Shannon entropy of recent errors mapped linearly onto [min_rate, max_rate]
+    hist = np.array(error_history)
+    probs = hist / hist.sum()
+    entropy_value = -np.sum(probs * np.log2(probs + 1e-9))
+
+    # Entropy range tuning: max entropy ~ log2(n)
+    norm_entropy = entropy_value / np.log2(max_history)  # 0 to 1
+    return min_rate + (max_rate - min_rate) * norm_entropy
+
+
+def serialize_payload(payload):
+    """JSON payload and its size in bytes; geometry becomes (x, y), timestamps ISO strings."""
+    # NumPy scalars (e.g. float32 fields of the compact schema) as plain Python values
+    payload = {k: v.item() if isinstance(v, np.generic) else v for k, v in payload.items()}
+    geom = payload.pop("geometry", None)
+    if geom:
+        payload["geometry"] = (geom.x, geom.y)
+    if isinstance(payload.get("datetime"), datetime):
+        payload["datetime"] = payload["datetime"].isoformat()
+
+    payload_json = json.dumps(payload)
+    return payload, len(payload_json.encode("utf-8"))
+
+
+def transmission_cost(payload_size_bytes, x, y, base_x, base_y, bitrate_bps=5470, power_watts=0.1,
+                      path_loss_db=None, excess_loss_db=0.0):
+    # Airtime and energy for one uplink; without a given path loss it draws one shadowing sample.
+    # excess_loss_db is the link's static terrain loss (utils/terrain.py)
+    tx_time_sec = payload_size_bytes * 8 / bitrate_bps
+
+    if path_loss_db is None:
+        path_loss_db = compute_path_loss_db(x, y, base_x, base_y, excess_db=excess_loss_db)
+
+    # ✅ Convert base power to dBm and apply path loss
+    path_loss_multiplier = min(10 ** (path_loss_db / 10), 1e9)  # cap to 1000×
+    adjusted_power_watts = power_watts * path_loss_multiplier
+
+    energy_mJ = adjusted_power_watts * tx_time_sec * 1000
+    return tx_time_sec, energy_mJ
+
+
+def adapted_transmission_cost(payload_size_bytes, x, y, base_x, base_y, radio, excess_loss_db=0.0, path_loss_db=None):
+    """Airtime, energy and log fields for an uplink at a link-adapted setting (utils/link_adaptation.py).
+
+    Energy is the radio's supply draw over the airtime; the shadowed path loss (the same
+    single draw as transmission_cost) only sets the packet's link margin.
+    """
+    tx_time_sec = payload_size_bytes * 8 / radio.bitrate_bps
+    if path_loss_db is None:
+        path_loss_db = compute_path_loss_db(x, y, base_x, base_y, excess_db=excess_loss_db)
+    energy_mJ = radio.supply_watts * tx_time_sec * 1000
+    fields = {
+        "bitrate_bps": radio.bitrate_bps,
+        "tx_power_dbm": radio.tx_power_dbm,
+        "link_margin_db": radio.tx_power_dbm - path_loss_db - radio.sensitivity_dbm,
+    }
+    return tx_time_sec, energy_mJ, fields
@@ -0,0 +1,65 @@
+import numpy as np
+from sensors.core import ENV_VARS
+
+# Geospatial edge of the sensor model. geopandas and shapely are imported on
+# first use so that importing the sensors does not pay for them.
+
+_READING_KEYS = ENV_VARS + ["datetime", "geometry", "sensor_id"]
+_frame_cells = (None, None)  # (last frame, {cell_id: first row position}) shared by a step's sensors
+
+
+def cell_reading(sensor_id, location, timestep_gdf, cell_id=None):
+    """Row of timestep_gdf whose cell contains location, as a dict; None when outside the grid.
+
+    With a cell_id from map_sensors_to_cells() the row is looked up by id instead of by
+    a spatial join; the reading is the same.
+    """
+    if cell_id is not None:
+        return _mapped_reading(sensor_id, location, timestep_gdf, cell_id)
+
+    import geopandas as gpd
+    from shapely.geometry import Point
+
+    sensor_gdf = gpd.GeoDataFrame(
+        [{"sensor_id": sensor_id}],
+        geometry=[Point(location.x, location.y)],
+        crs=timestep_gdf.crs
+    )
+
+    # Spatial join to find the grid cell containing the sensor
+    match = gpd.sjoin(sensor_gdf, timestep_gdf, how="left", predicate="within")
+    if match.empty:
+        return None
+
+    raw = match.iloc[0].to_dict()
+    return {k: raw.get(k, None) for k in _READING_KEYS}
+
+
+def _mapped_reading(sensor_id, location, timestep_gdf, cell_id):
+    global _frame_cells
+    frame, positions = _frame_cells
+    if frame is not timestep_gdf:
+        cells = timestep_gdf["cell_id"].tolist()
+        positions = {c: p for p, c in reversed(list(enumerate(cells)))}  # first row per cell, as sjoin
+        _frame_cells = (timestep_gdf, positions)
+
+    position = positions.get(cell_id)
+    if position is None:
+        # Same as the left join finding no cell: missing values at the sensor's position
+        raw = {k: np.nan for k in ENV_VARS + ["datetime"]}
+    else:
+        raw = timestep_gdf.iloc[position].to_dict()
+    raw["geometry"] = location
+    raw["sensor_id"] = sensor_id
+    return {k: raw.get(k, None) for k in _READING_KEYS}
+
+
+def map_sensors_to_cells(locations, grid):
+    """Cell id containing each location (one spatial join for the whole fleet); -1 outside the grid."""
+    import geopandas as gpd
+
+    points = gpd.GeoDataFrame(geometry=gpd.points_from_xy([l.x for l in locations], [l.y for l in locations]),
+                              crs=grid.crs)
+    match = gpd.sjoin(points, grid[["cell_id", "geometry"]], how="left", predicate="within")
+    match = match[~match.index.duplicated(keep="first")]
+    return match["cell_id"].fillna(-1).astype(np.int64).reindex(range(len(locations)), fill_value=-1).tolist()
@@ -1,35 +1,27 @@
 import pandas as pd
-from shapely.geometry import Point
-import geopandas as gpd
-import json
-import numpy as np
-from utils.path_loss import compute_path_loss_db
+from sensors import core
+from sensors.core import Location
 
 
 class TypicalSensor:
     def __init__(self, sensor_id, x, y, base_x, base_y):
         self.sensor_id = sensor_id
-        self.location = Point(x, y)
+        self.location = Location(x, y)
+        self.cell_id = None  # grid cell from map_sensors_to_cells(); None joins per step
+        self.link_loss_db = 0.0  # static terrain loss to the base (utils/terrain.py)
+        self.radio = None  # LinkSetting from utils/link_adaptation.py; None: fixed bitrate and power
         self.readings = pd.DataFrame()
 
         self.base_x = base_x
         self.base_y = base_y
 
     def read_from_simulation(self, timestep_gdf, log=True):
-        # Ensure both are in GeoDataFrames with same CRS
-        sensor_gdf = gpd.GeoDataFrame(
-            [{"sensor_id": self.sensor_id}],
-            geometry=[self.location],
-            crs=timestep_gdf.crs
-        )
-
-        match = gpd.sjoin(sensor_gdf, timestep_gdf, how="left", predicate="within")
-        if match.empty:
+        # Spatial join against the timestep's cells (geopandas loads on first call)
+        from sensors.spatial import cell_reading
+        reading = cell_reading(self.sensor_id, self.location, timestep_gdf, self.cell_id)
+        if reading is None:
             return None
 
-        env_vars = ["temperature", "wind_speed", "relative_humidity", "hotspot", "fwi"]
-        raw = match.iloc[0].to_dict()
-        reading = {k: raw.get(k, None) for k in env_vars + ["datetime", "geometry"]}
         reading["sensor_id"] = self.sensor_id
         reading["x"] = self.location.x
         reading["y"] = self.location.y
@@ -57,30 +49,18 @@ class TypicalSensor:
         payload_dict = latest.to_dict()
 
         # Clean up non-serializable fields
-        geom = payload_dict.pop("geometry", None)
-        if geom:
-            payload_dict["geometry"] = (geom.x, geom.y)
-
-        if "datetime" in payload_dict and isinstance(payload_dict["datetime"], pd.Timestamp):
-            payload_dict["datetime"] = payload_dict["datetime"].isoformat()
-
-        payload_json = json.dumps(payload_dict)
-        payload_size_bytes = len(payload_json.encode("utf-8"))
-        payload_size_bits = payload_size_bytes * 8
-
-        tx_time_sec = payload_size_bits / bitrate_bps
-
-        #base_x = 0  # Replace with your actual base station x
-        #base_y = 0  # Replace with your actual base station y
-
-        path_loss_db = compute_path_loss_db(self.location.x, self.location.y, self.base_x, self.base_y)
-
-        # ✅ Convert base power to dBm and apply path loss
-        path_loss_multiplier = min(10 ** (path_loss_db / 10), 1e9)  # cap to 1000×
-        adjusted_power_watts = power_watts * path_loss_multiplier
-
-
-        energy_mJ = adjusted_power_watts * tx_time_sec * 1000
+        payload_dict, payload_size_bytes = core.serialize_payload(payload_dict)
+        if self.radio is None:
+            tx_time_sec, energy_mJ = core.transmission_cost(
+                payload_size_bytes, self.location.x, self.location.y, self.base_x, self.base_y, bitrate_bps, power_watts,
+                excess_loss_db=self.link_loss_db
+            )
+            link_fields = {}
+        else:
+            tx_time_sec, energy_mJ, link_fields = core.adapted_transmission_cost(
+                payload_size_bytes, self.location.x, self.location.y, self.base_x, self.base_y, self.radio,
+                excess_loss_db=self.link_loss_db
+            )
 
         #print(f"[DEBUG] Payload keys: {list(payload_dict.keys())}")
 
@@ -96,7 +76,8 @@ class TypicalSensor:
             "wind_speed": payload_dict.get("wind_speed"),
             "relative_humidity": payload_dict.get("relative_humidity"),
             "hotspot": payload_dict.get("hotspot"),
-            "fwi": payload_dict.get("fwi")
+            "fwi": payload_dict.get("fwi"),
+            **link_fields
         }
 
 
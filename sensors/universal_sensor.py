@@ -1,16 +1,16 @@
 import pandas as pd
-from shapely.geometry import Point
-import geopandas as gpd
-import json
 import numpy as np
-from scipy.stats import entropy
 import os
-from utils.path_loss import compute_path_loss_db
+from sensors import core
+from sensors.core import Location
 
 class UniversalSensor:
     def __init__(self, sensor_id, x, y, base_x, base_y):
         self.sensor_id = sensor_id
-        self.location = Point(x, y)
+        self.location = Location(x, y)
+        self.cell_id = None  # grid cell from map_sensors_to_cells(); None joins per step
+        self.link_loss_db = 0.0  # static terrain loss to the base (utils/terrain.py)
+        self.radio = None  # LinkSetting from utils/link_adaptation.py; None: fixed bitrate and power
         self.readings = pd.DataFrame()
 
         self.base_x = base_x
@@ -26,32 +26,28 @@ class UniversalSensor:
         self.max_error_history = 10  # sliding window
 
         self.kl_threshold = float(os.getenv("KL_THRESHOLD", 1.0))
+        self.last_avg_kl = None  # surprise of the latest reading, set by transmit()
+        self.last_candidate = None  # record transmit() would send at any threshold
         self.max_error_history = int(os.getenv("ERROR_HISTORY", 20))
 
+        # Control policy tuning
+        self.control_error_threshold = float(os.getenv("CONTROL_ERROR_THRESHOLD", 2.0))
+        self.min_sampling_rate = float(os.getenv("SAMPLING_RATE_MIN", 0.2))
+        self.max_sampling_rate = float(os.getenv("SAMPLING_RATE_MAX", 1.0))
+
 
     def sense(self, timestep_gdf, log=True):
         if timestep_gdf.empty:
             return None
 
-        # Create a GeoDataFrame for the sensor point
-        sensor_gdf = gpd.GeoDataFrame(
-            [{"sensor_id": self.sensor_id}],
-            geometry=[self.location],
-            crs=timestep_gdf.crs
-        )
-
-        # Spatial join to find the grid cell containing the sensor
-        match = gpd.sjoin(sensor_gdf, timestep_gdf, how="left", predicate="within")
-        if match.empty:
+        # Spatial join to find the grid cell containing the sensor (geopandas loads on first call)
+        from sensors.spatial import cell_reading
+        reading = cell_reading(self.sensor_id, self.location, timestep_gdf, self.cell_id)
+        if reading is None:
             return None
 
-        reading = match.iloc[0].to_dict()
-        # Explicitly keep key environmental variables
-        env_vars = ["temperature", "wind_speed", "relative_humidity", "hotspot", "fwi"]
-
         reading["x"] = self.location.x
         reading["y"] = self.location.y
-        reading = {k: reading.get(k, None) for k in env_vars + ["x", "y", "geometry", "datetime", "sensor_id"]}
 
         if log:
             self.readings = pd.concat([self.readings, pd.DataFrame([reading])], ignore_index=True)
@@ -80,7 +76,7 @@ class UniversalSensor:
 
     def kl_divergence_gaussians(self, mu_p, mu_q, sigma=1.0):
         """KL(P‖Q): P = predicted, Q = observed"""
-        return (0.5 / sigma**2) * (mu_p - mu_q)**2
+        return core.kl_divergence_gaussians(mu_p, mu_q, sigma)
 
 
 
@@ -109,7 +105,7 @@ class UniversalSensor:
         if not prediction_error:
             return
         mean_error = sum(abs(v) for v in prediction_error.values()) / len(prediction_error)
-        if mean_error > 2.0:
+        if mean_error > self.control_error_threshold:
             self.current_config["sampling_rate"] *= 1.2
         else:
             self.current_config["sampling_rate"] *= 0.9
@@ -118,17 +114,10 @@ class UniversalSensor:
         if not self.error_history:
             return
 
-        # Normalize error distribution
-        hist = np.array(self.error_history)
-        probs = hist / hist.sum()
-        entropy_value = -np.sum(probs * np.log2(probs + 1e-9))
-
-        # Entropy range tuning: max entropy ~ log2(n)
-        max_entropy = np.log2(self.max_error_history)
-        norm_entropy = entropy_value / max_entropy  # 0 to 1
-
         # Linear control policy: more entropy → more sampling
-        self.current_config["sampling_rate"] = 0.2 + 0.8 * norm_entropy
+        self.current_config["sampling_rate"] = core.entropy_sampling_rate(
+            self.error_history, self.max_error_history, self.min_sampling_rate, self.max_sampling_rate
+        )
 
 
     def step(self, timestep_gdf):
@@ -154,6 +143,8 @@ class UniversalSensor:
         # Debug output for entropy-based adaptation
         #print(f"Sensor {self.sensor_id} | Sampling rate = {self.current_config['sampling_rate']:.2f}")
 
+        return observation  # None when the sensor skipped sampling this step
+
 
     def transmit(self, bitrate_bps=5470, power_watts=0.1):
         #print(f"[DEBUG] Universal Sensor {self.sensor_id} readings length: {len(self.readings)}")
@@ -165,36 +156,31 @@ class UniversalSensor:
         latest = self.readings.iloc[-1]
         latest_dict = latest.to_dict()
 
-        if not self.should_transmit(latest_dict):
+        # The candidate record is built whatever the threshold, so one run can be
+        # re-evaluated for any KL threshold (see utils/threshold_eval.py)
+        self.last_avg_kl = self.average_kl(latest_dict)
+        self.last_candidate = None
+        if self.last_avg_kl is None:
             return None
 
         # Clean serialization
-        geom = latest_dict.pop("geometry", None)
-        if geom:
-            latest_dict["geometry"] = (geom.x, geom.y)
-        if "datetime" in latest_dict and isinstance(latest_dict["datetime"], pd.Timestamp):
-            latest_dict["datetime"] = latest_dict["datetime"].isoformat()
-
-        payload_json = json.dumps(latest_dict)
-        payload_size_bytes = len(payload_json.encode("utf-8"))
-        payload_size_bits = payload_size_bytes * 8
-        tx_time_sec = payload_size_bits / bitrate_bps
-
-        #base_x = 0  # Replace with your actual base station x
-        #base_y = 0
-        path_loss_db = compute_path_loss_db(self.location.x, self.location.y, self.base_x, self.base_y)
-
-        # ✅ Convert base power to dBm and apply path loss
-        path_loss_multiplier = min(10 ** (path_loss_db / 10), 1e9)  # cap to 1000×
-        adjusted_power_watts = power_watts * path_loss_multiplier
-
-
-        energy_mJ = adjusted_power_watts * tx_time_sec * 1000
+        latest_dict, payload_size_bytes = core.serialize_payload(latest_dict)
+        if self.radio is None:
+            tx_time_sec, energy_mJ = core.transmission_cost(
+                payload_size_bytes, self.location.x, self.location.y, self.base_x, self.base_y, bitrate_bps, power_watts,
+                excess_loss_db=self.link_loss_db
+            )
+            link_fields = {}
+        else:
+            tx_time_sec, energy_mJ, link_fields = core.adapted_transmission_cost(
+                payload_size_bytes, self.location.x, self.location.y, self.base_x, self.base_y, self.radio,
+                excess_loss_db=self.link_loss_db
+            )
 
         #print(f"[DEBUG] Payload preview: {latest_dict}")
 
 
-        return {
+        self.last_candidate = {
             "sensor_id": self.sensor_id,
             "timestamp": latest_dict["datetime"],
             "data_sent_bytes": payload_size_bytes,
@@ -207,39 +193,33 @@ class UniversalSensor:
             "wind_speed": latest_dict.get("wind_speed"),
             "relative_humidity": latest_dict.get("relative_humidity"),
             "hotspot": latest_dict.get("hotspot"),
-            "fwi": latest_dict.get("fwi")
+            "fwi": latest_dict.get("fwi"),
+            **link_fields
         }
 
+        if not self.last_avg_kl > self.kl_threshold:
+            return None
+        return self.last_candidate
+
 
 
     def should_transmit(self, current_obs, threshold=None):
         threshold = threshold if threshold is not None else self.kl_threshold
 
-        if self.predicted_state is None or current_obs is None:
-            return False
-
-        total_kl = 0.0
-        count = 0
-        sigma = 1.0  # assumed standard deviation for all variables
-
-        for var in ["temperature", "wind_speed", "relative_humidity"]:
-            if var in self.predicted_state and var in current_obs:
-                mu_p = self.predicted_state[var]
-                mu_q = current_obs[var]
-                kl = self.kl_divergence_gaussians(mu_p, mu_q, sigma)
-                total_kl += kl
-                count += 1
-
-        if count == 0:
+        avg_kl = self.average_kl(current_obs)
+        if avg_kl is None:
             return False
 
-        avg_kl = total_kl / count
-
         # ✅ Debugging output
         #print(f"Sensor {self.sensor_id} | avg_KL = {avg_kl:.3f} | Transmit: {avg_kl > threshold}")
 
         return avg_kl > threshold
 
+    def average_kl(self, current_obs):
+        # Mean KL surprise over the predicted variables; None when nothing can be compared
+        sigma = 1.0  # assumed standard deviation for all variables
+        return core.average_kl(self.predicted_state, current_obs, sigma=sigma)
+
 
     def __repr__(self):
         return f"UniversalSensor(id={self.sensor_id}, x={self.location.x:.2f}, y={self.location.y:.2f})"
@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+gpd = pytest.importorskip("geopandas")
+shapely_geometry = pytest.importorskip("shapely.geometry")
+
+CELL_M = 1000
+CELLS = 21  # 21 km square: the 10 km deployment disk fits inside
+HOURS = 8
+
+
+def write_event(path):
+    # Elevation-free grid with hotspots clustered off-centre, so the optimized layout is lopsided
+    rng = np.random.default_rng(0)
+    cols, rows = np.meshgrid(np.arange(CELLS), np.arange(CELLS))
+    cols, rows = cols.ravel(), rows.ravel()
+    grid = gpd.GeoDataFrame(
+        {"cell_id": np.arange(CELLS * CELLS), "elevation": np.zeros(CELLS * CELLS)},
+        geometry=[shapely_geometry.box(c * CELL_M, r * CELL_M, (c + 1) * CELL_M, (r + 1) * CELL_M)
+                  for c, r in zip(cols, rows)],
+        crs="EPSG:3978",
+    )
+    burning = (np.abs(cols - 15) <= 2) & (np.abs(rows - 15) <= 2)
+
+    frames = []
+    for hour in range(HOURS):
+        frames.append(pd.DataFrame({
+            "cell_id": grid["cell_id"],
+            "datetime": str(pd.Timestamp("2016-05-03") + pd.Timedelta(hours=hour)),
+            "temperature": 15 + 20 * burning + rng.normal(0, 3, len(grid)),
+            "wind_speed": rng.uniform(0, 30, len(grid)),
+            "relative_humidity": rng.uniform(10, 60, len(grid)),
+            "hotspot": (burning & (rng.random(len(grid)) < 0.7)).astype(np.int64),
+            "fwi": 10 + 30 * burning + rng.uniform(0, 5, len(grid)),
+        }))
+    grid.to_file(path, layer="grid_cells", driver="GPKG")
+    gpd.GeoDataFrame(pd.concat(frames, ignore_index=True), geometry=None).to_file(
+        path, layer="fire_simulation_data", driver="GPKG")
+
+
+def test_optimized_placement_lowers_simulated_energy(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("MPLBACKEND", "Agg")
+    (tmp_path / "data").mkdir()
+    write_event("data/simulation.gpkg")
+
+    from utils import deployment, placement, run_cache
+    from scripts.run_simulation import run_simulation
+
+    for module in (deployment, placement):
+        monkeypatch.setattr(module, "TYPICAL_COUNT", 20)
+        monkeypatch.setattr(module, "UNIVERSAL_COUNT", 20)
+    monkeypatch.setattr(run_cache, "CACHE_ENABLED", False)
+    (tmp_path / "results").mkdir(exist_ok=True)
+    deployment.deploy_and_save()
+    optimized = placement.optimize_and_save()
+
+    # The simulation's base (mean of the rows) is the base the optimizer scored against
+    sites = optimized[optimized["sensor_type"] != "base_station"]
+    base = optimized[optimized["sensor_type"] == "base_station"].iloc[0]
+    assert np.isclose(optimized["x"].mean(), base["x"]) and np.isclose(optimized["y"].mean(), base["y"])
+    assert np.isclose(sites["x"].mean(), base["x"])
+
+    def energy_j(sensor_csv, name):
+        metrics = run_simulation("2016-05-03 00:00:00", f"2016-05-03 0{HOURS - 1}:00:00", 0, sensor_csv,
+                                 "data/simulation.gpkg", str(tmp_path / name))
+        return metrics["energy_j"]
+
+    baseline = energy_j(deployment.OUTPUT_CSV, "baseline")
+    assert energy_j(placement.OUTPUT_CSV, "optimized") < baseline
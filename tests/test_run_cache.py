@@ -0,0 +1,58 @@
+import pytest
+from utils import run_cache
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(run_cache, "CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(run_cache, "CACHE_ENABLED", True)
+    return tmp_path
+
+
+def test_restore_skips_targets_the_cached_run_did_not_write(cache_dir):
+    run_dir = cache_dir / "run"
+    run_dir.mkdir()
+    (run_dir / "experiment.csv").write_text("sensor_id\n1\n")
+    run_cache.store("key", {"transmissions": 1}, {"experiment": str(run_dir / "experiment.csv"),
+                                                  "sensing_trace": str(run_dir / "sensing_trace.npz")})
+
+    out = cache_dir / "out"
+    out.mkdir()
+    (out / "sensing_trace.npz").write_text("stale")  # left by an earlier run
+    targets = {name: str(out / filename) for name, filename in
+               [("experiment", "experiment.csv"), ("sensing_trace", "sensing_trace.npz"),
+                ("suppression", "suppression.csv")]}
+
+    assert run_cache.restore("key", targets) == {"transmissions": 1}
+    assert (out / "experiment.csv").read_text() == "sensor_id\n1\n"
+    assert not (out / "sensing_trace.npz").exists()
+    assert not (out / "suppression.csv").exists()
+
+
+def test_restore_misses_unknown_key(cache_dir):
+    assert run_cache.restore("missing", {"experiment": str(cache_dir / "experiment.csv")}) is None
+
+
+def test_code_fingerprint_covers_every_simulation_module(tmp_path, monkeypatch):
+    for rel_path in ["scripts/run_simulation.py", "sensors/core.py", "utils/threshold_eval.py",
+                     "utils/nested/helper.py", "utils/__pycache__/stale.py"]:
+        (tmp_path / rel_path).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / rel_path).write_text("x = 1\n")
+    monkeypatch.setattr(run_cache, "REPO_ROOT", str(tmp_path))
+    assert "utils/__pycache__/stale.py" not in run_cache.sim_code_files()
+
+    before = run_cache.code_fingerprint()
+    (tmp_path / "utils/nested/helper.py").write_text("x = 2\n")
+    assert run_cache.code_fingerprint() != before
+
+
+def test_corrupt_index_and_meta_are_misses_not_errors(cache_dir, monkeypatch):
+    monkeypatch.setattr(run_cache, "FINGERPRINT_INDEX", str(cache_dir / "cache" / "fingerprints.json"))
+    (cache_dir / "cache" / "key").mkdir(parents=True)
+    (cache_dir / "cache" / "fingerprints.json").write_text('{"truncated": ')
+    (cache_dir / "cache" / "key" / "meta.json").write_text('{"metrics": ')
+    (cache_dir / "input.csv").write_text("a\n1\n")
+
+    assert run_cache.file_fingerprint(str(cache_dir / "input.csv"))
+    assert run_cache.restore("key", {}) is None
+    assert run_cache._entries() == []
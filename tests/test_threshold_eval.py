@@ -0,0 +1,16 @@
+import numpy as np
+import pandas as pd
+from utils.threshold_eval import evaluate_thresholds, transmission_log_for_threshold
+
+
+def test_undelivered_packets_cost_energy_but_recover_nothing():
+    trace = pd.DataFrame({
+        "sensor_id": [1, 2, 3], "avg_kl": [np.nan, 2.0, 3.0], "hotspot": [1, 1, 1],
+        "energy_used_mJ": [1.0, 1.0, 1.0], "data_sent_bytes": [10, 10, 10], "sampling_rate": [1.0, 1.0, 1.0],
+        "mac_delivered": [np.nan, True, False],
+    })
+    row = evaluate_thresholds(trace, [1.0]).iloc[0]
+    assert row["transmissions"] == 2
+    assert row["energy_j"] == 0.002
+    assert row["hotspot_recovery_rate"] == 1 / 3
+    assert transmission_log_for_threshold(trace, 1.0)["sensor_id"].tolist() == [2]
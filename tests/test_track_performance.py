@@ -0,0 +1,15 @@
+import pandas as pd
+import pytest
+from scripts.track_performance import select_entry
+
+
+def test_select_entry_reads_all_digit_refs_as_commit_prefixes():
+    history = pd.DataFrame({"commit": ["1234567", "abcdef0", "1239999"], "scenario": ["a", "a", "a"]})
+    assert select_entry(history, "1234567") == 0
+    assert select_entry(history, "123") == 2
+    assert select_entry(history, "-1") == 2
+    assert select_entry(history, "-3") == 0
+    with pytest.raises(ValueError):
+        select_entry(history, "-4")
+    with pytest.raises(ValueError):
+        select_entry(history, "7654321")
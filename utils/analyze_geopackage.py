@@ -1,6 +1,13 @@
 import geopandas as gpd
 import pandas as pd
+import numpy as np
 import fiona
+import os
+from concurrent.futures import ProcessPoolExecutor
+from utils.sketches import ColumnSketch
+
+CHUNK_ROWS = int(os.getenv("PROFILE_CHUNK_ROWS", 100_000))
+PROFILE_WORKERS = int(os.getenv("PROFILE_WORKERS", 1))  # >1 profiles layers in parallel processes
 
 def summarize_layer(df, layer_name):
     summary = [f"--- Layer: {layer_name} ---"]
@@ -32,8 +39,107 @@ def summarize_layer(df, layer_name):
 
     return "\n".join(summary)
 
+class LayerProfile:
+    """Streaming counterpart of summarize_layer: chunks are folded into mergeable sketches."""
+
+    def __init__(self, layer_name):
+        self.layer_name = layer_name
+        self.records = 0
+        self.columns = None
+        self.geometry_name = None
+        self.crs = None
+        self.geom_types = []
+        self.bounds = np.array([np.inf, np.inf, -np.inf, -np.inf])
+        self.has_geometry = False
+        self.sketches = {}
+
+    def update(self, df):
+        if self.columns is None:
+            self.columns = list(df.columns)
+            if isinstance(df, gpd.GeoDataFrame) and df.geometry.name in df.columns:
+                self.geometry_name = df.geometry.name
+                self.crs = df.crs
+        self.records += len(df)
+
+        if self.geometry_name is not None:
+            geoms = df.geometry[df.geometry.notna()]
+            if len(geoms):
+                self.has_geometry = True
+                for geom_type in geoms.geom_type.unique():
+                    if geom_type not in self.geom_types:
+                        self.geom_types.append(geom_type)
+                chunk_bounds = geoms.total_bounds
+                self.bounds[:2] = np.fmin(self.bounds[:2], chunk_bounds[:2])
+                self.bounds[2:] = np.fmax(self.bounds[2:], chunk_bounds[2:])
+
+        for col in df.columns:
+            if col == self.geometry_name:
+                continue
+            sketch = self.sketches.setdefault(col, ColumnSketch(col))
+            try:
+                sketch.update(df[col])
+            except Exception as e:
+                sketch.error = e
+        return self
+
+    def summary(self):
+        summary = [f"--- Layer: {self.layer_name} ---"]
+        summary.append(f"Number of records: {self.records}")
+        summary.append(f"Columns: {self.columns or []}")
+
+        if self.has_geometry:
+            if self.crs is None:
+                summary.append("CRS was missing. Set to EPSG:3978 (NAD83 / Canada Atlas Lambert).")
+            else:
+                summary.append(f"CRS: {self.crs}")
+            summary.append(f"Geometry type(s): {self.geom_types}")
+            summary.append(f"Bounds: {self.bounds}")
+        else:
+            summary.append("No valid geometry column; treating as attribute table.")
+
+        for col in self.columns or []:
+            if col == self.geometry_name and self.has_geometry:
+                continue
+            summary.append(f"\nColumn: {col}")
+            if col == self.geometry_name:
+                # All geometries were null, so it is described like any attribute column
+                summary.append(str(pd.Series([0, 0, np.nan, np.nan], index=["count", "unique", "top", "freq"],
+                                             name=col, dtype="object")))
+                continue
+            sketch = self.sketches[col]
+            if hasattr(sketch, "error"):
+                summary.append(f"Could not summarize column: {sketch.error}")
+                continue
+            summary.append(str(sketch.describe()))
+
+        return "\n".join(summary)
+
+def profile_layer(gpkg_path, layer, chunk_rows=CHUNK_ROWS):
+    # Memory is bounded by chunk_rows, not by the layer size
+    try:
+        with fiona.open(gpkg_path, layer=layer) as src:
+            total = len(src)
+        profile = LayerProfile(layer)
+        for start in range(0, max(total, 1), chunk_rows):
+            chunk = gpd.read_file(gpkg_path, layer=layer, rows=slice(start, start + chunk_rows))
+            profile.update(chunk)
+        return profile.summary()
+    except Exception as e:
+        return f"--- Layer: {layer} ---\nError loading layer: {e}"
+
 def summarize_geopackage(gpkg_path):
     layers = fiona.listlayers(gpkg_path)
+
+    if PROFILE_WORKERS > 1 and len(layers) > 1:
+        with ProcessPoolExecutor(max_workers=min(PROFILE_WORKERS, len(layers))) as pool:
+            summaries = list(pool.map(profile_layer, [gpkg_path] * len(layers), layers))
+    else:
+        summaries = [profile_layer(gpkg_path, layer) for layer in layers]
+
+    return "\n\n".join(summaries)
+
+def summarize_geopackage_in_memory(gpkg_path):
+    layers = fiona.listlayers(gpkg_path)
     summaries = []
 
     for layer in layers:
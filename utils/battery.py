@@ -0,0 +1,91 @@
+import os
+import numpy as np
+import pandas as pd
+
+# Battery model; capacity 0 (the default) means unlimited, which leaves runs unchanged
+BATTERY_CAPACITY_J = float(os.getenv("BATTERY_CAPACITY_J", 0))
+SENSE_ENERGY_MJ = float(os.getenv("SENSE_ENERGY_MJ", 0.5))  # per reading taken
+IDLE_POWER_MW = float(os.getenv("IDLE_POWER_MW", 0.05))  # sleep/housekeeping draw while alive
+BATTERY_DIR = os.getenv("METRICS_DIR", "results/metrics")
+
+
+class BatteryBank:
+    """Residual energy of every sensor in one array, drained once per step.
+
+    The simulation fills sensed (bool) and tx_mJ (float) per sensor position during a
+    step and calls drain(); sensors that hit zero are retired from later steps.
+    """
+
+    def __init__(self, sensor_types, capacity_j=BATTERY_CAPACITY_J, sense_mJ=SENSE_ENERGY_MJ,
+                 idle_mW=IDLE_POWER_MW):
+        self.sensor_types = np.asarray(sensor_types)
+        n = len(self.sensor_types)
+        self.enabled = capacity_j > 0
+        self.capacity_mJ = capacity_j * 1000 if self.enabled else np.inf
+        self.residual_mJ = np.full(n, self.capacity_mJ, dtype=float)
+        self.alive = np.ones(n, dtype=bool)
+        self.death_time = np.full(n, np.datetime64("NaT"), dtype="datetime64[ns]")
+        self.sense_mJ = sense_mJ
+        self.idle_mW = idle_mW
+        self.start = None
+        self.timeline = []
+        self._type_masks = {t: self.sensor_types == t for t in np.unique(self.sensor_types)}
+
+    def active(self):
+        # Positions of sensors still powered
+        return np.flatnonzero(self.alive)
+
+    def drain(self, timestep, step_hours, sensed, tx_mJ):
+        timestep = np.datetime64(pd.Timestamp(timestep), "ns")
+        if self.start is None:
+            self.start = timestep
+
+        # Idle draw for every live sensor, plus sensing and radio for those that used them
+        cost = self.idle_mW * step_hours * 3600 + self.sense_mJ * sensed + tx_mJ
+        self.residual_mJ -= np.where(self.alive, cost, 0.0)
+
+        died = self.alive & (self.residual_mJ <= 0)
+        self.residual_mJ[died] = 0.0
+        self.death_time[died] = timestep
+        self.alive &= ~died
+
+        row = {"datetime": timestep}
+        for sensor_type, mask in self._type_masks.items():
+            row[f"alive_{sensor_type}"] = int(self.alive[mask].sum())
+            row[f"alive_fraction_{sensor_type}"] = self.alive[mask].mean()
+            row[f"residual_fraction_{sensor_type}"] = (self.residual_mJ[mask].mean() / self.capacity_mJ
+                                                       if self.enabled else 1.0)
+        self.timeline.append(row)
+
+    def timeline_table(self):
+        return pd.DataFrame(self.timeline)
+
+    def summary(self):
+        """Time to first death, fleet half-life and final survival per sensor type (hours from start)."""
+        timeline = self.timeline_table()
+        rows = []
+        for sensor_type, mask in self._type_masks.items():
+            deaths = self.death_time[mask]
+            deaths = deaths[~np.isnat(deaths)]
+            first = deaths.min() if len(deaths) else np.datetime64("NaT")
+            below_half = timeline[timeline[f"alive_fraction_{sensor_type}"] <= 0.5]["datetime"] \
+                if not timeline.empty else pd.Series(dtype="datetime64[ns]")
+            half = below_half.iloc[0] if not below_half.empty else pd.NaT
+            rows.append({
+                "sensor_type": sensor_type,
+                "sensors": int(mask.sum()),
+                "dead": int((~self.alive[mask]).sum()),
+                "first_death_h": (pd.Timestamp(first) - pd.Timestamp(self.start)) / pd.Timedelta(hours=1),
+                "half_life_h": (pd.Timestamp(half) - pd.Timestamp(self.start)) / pd.Timedelta(hours=1),
+                "final_alive_fraction": self.alive[mask].mean(),
+            })
+        return pd.DataFrame(rows)
+
+    def save(self, output_dir=BATTERY_DIR):
+        os.makedirs(output_dir, exist_ok=True)
+        written = {}
+        for name, table in [("battery_timeline", self.timeline_table()), ("battery_summary", self.summary())]:
+            path = os.path.join(output_dir, f"{name}.csv")
+            table.to_csv(path, index=False)
+            written[name] = path
+        return written
@@ -3,16 +3,24 @@ import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import os
+import shapely
+from scipy.spatial import cKDTree
 from shapely.geometry import Point
+from utils.rasterize import CellRaster
 
 # CONFIG
 GPKG_PATH = "data/simulation.gpkg"
 GRID_LAYER = "grid_cells"
 OUTPUT_CSV = "results/sensor_deployment.csv"
 CRS = "EPSG:3978"
-TYPICAL_COUNT = 1000
-UNIVERSAL_COUNT = 1000
+TYPICAL_COUNT = int(os.getenv("TYPICAL_COUNT", 1000))
+UNIVERSAL_COUNT = int(os.getenv("UNIVERSAL_COUNT", 1000))
 MAX_DISTANCE_KM = 10  # Radius for sensor placement
+DEPLOY_SEED = int(os.getenv("DEPLOY_SEED", 0))
+MIN_SPACING_M = float(os.getenv("MIN_SPACING_M", 0))  # across all sensor layers; 0 disables
+MAX_SENSORS_PER_CELL = int(os.getenv("MAX_SENSORS_PER_CELL", 0))  # per sensor layer; 0 disables
+MAX_PLACEMENT_ROUNDS = 50
+RENDER_BACKEND = os.getenv("RENDER_BACKEND", "polygon")  # "raster" draws the grid as one image
 
 os.makedirs("results", exist_ok=True)
 
@@ -28,33 +36,94 @@ def get_base_station(grid):
     base_station = Point(center_x, center_y)
     return base_station
 
-def generate_sensors(base_station, count, label, crs):
-    sensors = []
-    for _ in range(count):
-        angle = np.random.uniform(0, 2 * np.pi)
-        radius = np.sqrt(np.random.uniform(0, 1)) * MAX_DISTANCE_KM * 1000  # uniform in area
-        dx = radius * np.cos(angle)
-        dy = radius * np.sin(angle)
-        sensor_point = Point(base_station.x + dx, base_station.y + dy)
-        sensors.append({
-            "sensor_type": label,
-            "geometry": sensor_point
-        })
-    return gpd.GeoDataFrame(sensors, crs=crs)
+def sample_disk(rng, center, n, radius_m):
+    angle = rng.uniform(0, 2 * np.pi, n)
+    radius = np.sqrt(rng.uniform(0, 1, n)) * radius_m  # uniform in area
+    return center.x + radius * np.cos(angle), center.y + radius * np.sin(angle)
+
+def locate_cells(tree, x, y):
+    # Grid row containing each point, -1 if it falls outside every cell
+    point_idx, cell_idx = tree.query(shapely.points(x, y), predicate="within")
+    cells = np.full(len(x), -1, dtype=np.int64)
+    cells[point_idx[::-1]] = cell_idx[::-1]  # first match wins on shared edges
+    return cells
+
+def generate_sensors(base_station, count, label, crs, rng=None, grid_tree=None, placed_xy=None,
+                     min_spacing_m=MIN_SPACING_M, max_per_cell=MAX_SENSORS_PER_CELL):
+    rng = rng if rng is not None else np.random.default_rng(DEPLOY_SEED)
+    placed_xy = placed_xy if placed_xy is not None else np.empty((0, 2))
+    accepted_xy = np.empty((0, 2))
+    accepted_cells = np.empty(0, dtype=np.int64)
+
+    for _ in range(MAX_PLACEMENT_ROUNDS):
+        missing = count - len(accepted_xy)
+        if missing <= 0:
+            break
+
+        # Oversample a little so most rounds finish the layer in one go
+        x, y = sample_disk(rng, base_station, int(missing * 1.2) + 16, MAX_DISTANCE_KM * 1000)
+        keep = np.ones(len(x), dtype=bool)
+
+        if grid_tree is not None:
+            cells = locate_cells(grid_tree, x, y)
+            keep &= cells >= 0
+        else:
+            cells = np.zeros(len(x), dtype=np.int64)
+
+        if max_per_cell > 0:
+            # Rank candidates within their cell and keep only what the cell has room for
+            cand = np.flatnonzero(keep)
+            order = cand[np.argsort(cells[cand], kind="stable")]
+            sorted_cells = cells[order]
+            starts = np.r_[0, np.flatnonzero(np.diff(sorted_cells)) + 1]
+            rank = np.arange(len(order)) - np.repeat(starts, np.diff(np.r_[starts, len(order)]))
+            used = np.bincount(accepted_cells, minlength=cells.max() + 1)
+            keep[order[rank + used[sorted_cells] >= max_per_cell]] = False
+
+        if min_spacing_m > 0:
+            xy = np.column_stack([x, y])
+            existing = np.vstack([placed_xy, accepted_xy])
+            if len(existing):
+                dist, _ = cKDTree(existing).query(xy, distance_upper_bound=min_spacing_m)
+                keep &= ~(dist < min_spacing_m)
+            cand = np.flatnonzero(keep)
+            pairs = cKDTree(xy[cand]).query_pairs(min_spacing_m, output_type="ndarray")
+            keep[cand[pairs[:, 1]]] = False  # of each close pair, the later draw loses
+
+        new = np.flatnonzero(keep)[:missing]
+        accepted_xy = np.vstack([accepted_xy, np.column_stack([x[new], y[new]])])
+        accepted_cells = np.concatenate([accepted_cells, cells[new]])
+
+    if len(accepted_xy) < count:
+        raise RuntimeError(
+            f"Placed only {len(accepted_xy)} of {count} {label} sensors; "
+            "relax MIN_SPACING_M / MAX_SENSORS_PER_CELL or increase MAX_DISTANCE_KM"
+        )
+
+    return gpd.GeoDataFrame(
+        {"sensor_type": label, "x": accepted_xy[:, 0], "y": accepted_xy[:, 1]},
+        geometry=gpd.points_from_xy(accepted_xy[:, 0], accepted_xy[:, 1]),
+        crs=crs,
+    )
 
 def deploy_and_save():
     grid = load_grid()
     base_station = get_base_station(grid)
 
-    typical_sensors = generate_sensors(base_station, TYPICAL_COUNT, "typical", CRS)
-    universal_sensors = generate_sensors(base_station, UNIVERSAL_COUNT, "universal", CRS)
+    rng = np.random.default_rng(DEPLOY_SEED)
+    grid_tree = shapely.STRtree(grid.geometry.values)
 
-    base_df = gpd.GeoDataFrame([{"sensor_type": "base_station", "geometry": base_station}], crs=CRS)
+    typical_sensors = generate_sensors(base_station, TYPICAL_COUNT, "typical", CRS, rng, grid_tree)
+    universal_sensors = generate_sensors(
+        base_station, UNIVERSAL_COUNT, "universal", CRS, rng, grid_tree,
+        placed_xy=typical_sensors[["x", "y"]].to_numpy(),
+    )
 
-    all_sensors = pd.concat([typical_sensors, universal_sensors, base_df], ignore_index=True)
-    all_sensors["x"] = all_sensors.geometry.x
-    all_sensors["y"] = all_sensors.geometry.y
+    base_df = gpd.GeoDataFrame(
+        [{"sensor_type": "base_station", "x": base_station.x, "y": base_station.y, "geometry": base_station}], crs=CRS
+    )
 
+    all_sensors = pd.concat([typical_sensors, universal_sensors, base_df], ignore_index=True)
     all_sensors[["sensor_type", "x", "y"]].to_csv(OUTPUT_CSV, index=False)
     print(f"Sensor deployment saved to {OUTPUT_CSV}")
 
@@ -66,14 +135,20 @@ def visualize_deployment(typical, universal, base, grid):
     fig, ax = plt.subplots(figsize=(12, 10))
 
     # Plot elevation as grayscale
-    grid.plot(
-        column="elevation",
-        ax=ax,
-        cmap="Greys_r",
-        legend=True,
-        legend_kwds={"label": "Elevation (m)", "shrink": 0.6},
-        edgecolor="none",
-    )
+    if RENDER_BACKEND == "raster":
+        raster = CellRaster.from_grid(grid)
+        elevation = np.append(grid["elevation"].to_numpy(dtype=float), np.nan)[raster.index]
+        image = ax.imshow(np.ma.masked_invalid(elevation), extent=raster.extent, cmap="Greys_r", origin="upper")
+        fig.colorbar(image, ax=ax, label="Elevation (m)", shrink=0.6)
+    else:
+        grid.plot(
+            column="elevation",
+            ax=ax,
+            cmap="Greys_r",
+            legend=True,
+            legend_kwds={"label": "Elevation (m)", "shrink": 0.6},
+            edgecolor="none",
+        )
 
     # Plot sensors
     typical.plot(ax=ax, markersize=5, color="blue", label="Typical Sensors")
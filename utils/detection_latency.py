@@ -0,0 +1,120 @@
+import os
+import numpy as np
+import pandas as pd
+
+# CONFIG
+GPKG_PATH = "data/simulation.gpkg"
+GRID_LAYER = "grid_cells"
+DATA_LAYER = "fire_simulation_data"
+CRS = "EPSG:3978"
+DETECTION_RADIUS_M = float(os.getenv("DETECTION_RADIUS_M", 1000))  # sensor-to-cell-centroid distance
+DETECTION_HORIZON_H = float(os.getenv("DETECTION_HORIZON_H", 6))  # later reports count as misses
+
+
+def hotspot_onsets(fire_df, cell_xy):
+    """One row per hotspot onset: a cell turning hot after a cold (or no) previous record.
+
+    fire_df needs cell_id, datetime and hotspot; cell_xy maps cell_id -> (x, y).
+    """
+    df = fire_df[["cell_id", "datetime", "hotspot"]].copy()
+    df["datetime"] = pd.to_datetime(df["datetime"])
+    df = df.sort_values(["cell_id", "datetime"], kind="stable")
+
+    hot = df["hotspot"].to_numpy() == 1
+    cells = df["cell_id"].to_numpy()
+    prev_hot = np.r_[False, hot[:-1]] & np.r_[False, cells[1:] == cells[:-1]]
+    onsets = df[hot & ~prev_hot][["cell_id", "datetime"]].rename(columns={"datetime": "onset_time"})
+
+    xy = cell_xy.reindex(onsets["cell_id"])
+    onsets["x"] = xy["x"].to_numpy()
+    onsets["y"] = xy["y"].to_numpy()
+    return onsets.dropna(subset=["x", "y"]).reset_index(drop=True)
+
+
+def load_hotspot_onsets(start=None, end=None, gpkg_path=GPKG_PATH):
+    import geopandas as gpd  # deferred: run_metrics imports this module in every simulation run
+
+    grid = gpd.read_file(gpkg_path, layer=GRID_LAYER).to_crs(CRS)
+    centroids = grid.geometry.centroid
+    cell_xy = pd.DataFrame({"x": centroids.x.to_numpy(), "y": centroids.y.to_numpy()},
+                           index=grid["cell_id"].astype(int))
+
+    fire_df = gpd.read_file(gpkg_path, layer=DATA_LAYER, columns=["cell_id", "datetime", "hotspot"],
+                            ignore_geometry=True)
+    fire_df["cell_id"] = fire_df["cell_id"].astype(int)
+    fire_df["datetime"] = pd.to_datetime(fire_df["datetime"])
+    if start is not None:
+        fire_df = fire_df[fire_df["datetime"] >= pd.to_datetime(start)]
+    if end is not None:
+        fire_df = fire_df[fire_df["datetime"] <= pd.to_datetime(end)]
+    return hotspot_onsets(fire_df, cell_xy)
+
+
+def detection_latency(onsets, sensor_df, tx_log, radius_m=DETECTION_RADIUS_M, horizon_h=DETECTION_HORIZON_H):
+    """Latency from each onset to the first transmission by a sensor within radius_m.
+
+    sensor_df is the deployment table indexed by sensor_id; tx_log needs sensor_id and
+    timestamp. Returns onsets with latency_h (NaN = missed) and sensors_in_range.
+    """
+    result = onsets.copy()
+    result["latency_h"] = np.nan
+    result["sensors_in_range"] = 0
+    if result.empty:
+        return result
+
+    from scipy.spatial import cKDTree
+
+    sensor_ids = sensor_df.index.to_numpy()
+    tree = cKDTree(sensor_df[["x", "y"]].to_numpy(dtype=float))
+    neighbors = tree.query_ball_point(result[["x", "y"]].to_numpy(dtype=float), radius_m, return_sorted=False)
+    counts = np.fromiter((len(n) for n in neighbors), dtype=np.int64, count=len(neighbors))
+    result["sensors_in_range"] = counts
+    if counts.sum() == 0:
+        return result
+
+    pair_onset = np.repeat(np.arange(len(result)), counts)
+    pair_sensor = np.concatenate([np.asarray(n, dtype=np.int64) for n in neighbors if len(n)])
+
+    # Transmissions sorted by (sensor position, time), flattened into one int64 key
+    onset_s = result["onset_time"].to_numpy("datetime64[s]").astype(np.int64)
+    tx_pos = pd.Index(sensor_ids).get_indexer(tx_log["sensor_id"].to_numpy())
+    tx_s = pd.to_datetime(tx_log["timestamp"]).to_numpy("datetime64[s]").astype(np.int64)
+    keep = tx_pos >= 0
+    tx_pos, tx_s = tx_pos[keep], tx_s[keep]
+    if len(tx_s) == 0:
+        return result
+
+    t0 = min(onset_s.min(), tx_s.min())
+    span = max(onset_s.max(), tx_s.max()) - t0 + 1
+    keys = np.sort(tx_pos * span + (tx_s - t0))
+
+    query = pair_sensor * span + (onset_s[pair_onset] - t0)
+    pos = np.searchsorted(keys, query, side="left")
+    found = pos < len(keys)
+    next_key = keys[np.minimum(pos, len(keys) - 1)]
+    found &= next_key // span == pair_sensor  # first transmission must belong to the same sensor
+    delay_h = (next_key - query) / 3600.0
+    found &= delay_h <= horizon_h
+
+    best = np.full(len(result), np.inf)
+    np.minimum.at(best, pair_onset[found], delay_h[found])
+    result["latency_h"] = np.where(np.isfinite(best), best, np.nan)
+    return result
+
+
+def summarize_latency(latency_df):
+    latency = latency_df["latency_h"]
+    detected = latency.notna()
+    uncovered = latency_df["sensors_in_range"] == 0
+    total = len(latency_df)
+    return {
+        "onsets": total,
+        "detected": int(detected.sum()),
+        "missed": int((~detected).sum()),
+        "missed_no_sensor_in_range": int(uncovered.sum()),
+        "detection_rate": detected.sum() / total if total > 0 else 0,
+        "latency_mean_h": latency.mean(),
+        "latency_median_h": latency.median(),
+        "latency_p90_h": latency.quantile(0.9),
+        "latency_max_h": latency.max(),
+    }
@@ -1,9 +1,15 @@
 import geopandas as gpd
 import pandas as pd
+import numpy as np
 import matplotlib.pyplot as plt
 import imageio.v2 as imageio
 import os
+import shapely
+from concurrent.futures import ProcessPoolExecutor
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
 from tqdm import tqdm
+from utils.rasterize import CellRaster
 
 # Config
 GPKG_PATH = "data/simulation.gpkg"
@@ -13,6 +19,12 @@ DATA_LAYER = "fire_simulation_data"
 VARIABLES = ["hotspot"]
 CRS = "EPSG:3978"
 OUT_DIR = "results/output_gifs"
+RENDER_WORKERS = int(os.getenv("RENDER_WORKERS", os.cpu_count() or 1))
+ANIMATION_FORMATS = os.getenv("ANIMATION_FORMATS", "gif").split(",")  # gif and/or mp4
+FRAME_DURATION_SEC = 0.5
+RENDER_BACKEND = os.getenv("RENDER_BACKEND", "polygon")  # "polygon" or "raster"
+RASTER_RESOLUTION_M = float(os.getenv("RASTER_RESOLUTION_M", 0)) or None  # default: RASTER_WIDTH_PX wide
+SENSOR_OVERLAY_CSV = os.getenv("SENSOR_OVERLAY_CSV")  # raster frames only
 os.makedirs(OUT_DIR, exist_ok=True)
 
 def load_data():
@@ -21,106 +33,226 @@ def load_data():
     data = gpd.read_file(GPKG_PATH, layer=DATA_LAYER)
     return grid, pd.DataFrame(data)
 
-def generate_gif_for_variable(grid, data, variable):
-    gif_path = os.path.join(OUT_DIR, f"{variable}.gif")
-    images = []
+def save_animation(frames, path_stem):
+    # Frames are RGBA arrays; GIF keeps the original 0.5 s per frame, MP4 the same rate
+    for fmt in ANIMATION_FORMATS:
+        fmt = fmt.strip().lower()
+        if fmt == "gif":
+            imageio.mimsave(f"{path_stem}.gif", frames, duration=FRAME_DURATION_SEC)
+        elif fmt == "mp4":
+            imageio.mimsave(f"{path_stem}.mp4", [f[..., :3] for f in frames], fps=1 / FRAME_DURATION_SEC)
+        else:
+            raise ValueError(f"Unsupported animation format: {fmt}")
+        print(f"Saved animation to {path_stem}.{fmt}")
+
+def canvas_to_array(fig):
+    # Same pixels savefig(dpi=100) would write, copied straight out of the Agg buffer
+    fig.canvas.draw()
+    return np.asarray(fig.canvas.buffer_rgba()).copy()
+
+def frame_matrix(grid, data, variable, datetimes):
+    # (timestep, grid row) array of values; NaN where a cell has no record
+    frame = data.drop_duplicates(["datetime", "cell_id"]).pivot(index="datetime", columns="cell_id", values=variable)
+    frame = frame.reindex(index=datetimes, columns=grid["cell_id"])
+    return frame.to_numpy(dtype=float)
+
+def part_index(grid):
+    # GeoPandas explodes multi-part cells into one path per part; map parts back to rows
+    return np.repeat(np.arange(len(grid)), shapely.get_num_geometries(grid.geometry.values))
+
+# Per-process renderer state, built once by the pool initializer
+_renderer = {}
+
+def _init_variable_renderer(grid, variable):
+    fig = Figure(figsize=(8, 6), dpi=100)
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+
+    # Build the polygon collection once; frames only swap its color array
+    grid.plot(ax=ax, color="lightgrey", edgecolor="none")
+    collection = ax.collections[-1]
+    cmap = plt.get_cmap("inferno").copy()
+    cmap.set_bad("lightgrey")
+    collection.set_cmap(cmap)
+    collection.set_array(np.ma.masked_all(len(part_index(grid))))
+    collection.set_clim(0, 1)
+    fig.colorbar(collection, ax=ax, shrink=0.6)
+
+    title = ax.set_title(f"{variable} @ ", fontsize=12)
+    ax.axis("off")
+    fig.tight_layout()
 
+    _renderer.update(fig=fig, collection=collection, title=title, variable=variable, parts=part_index(grid))
+
+def _render_variable_frames(chunk):
+    fig = _renderer["fig"]
+    collection = _renderer["collection"]
+    frames = []
+    for dt, values in chunk:
+        values = np.ma.masked_invalid(values[_renderer["parts"]])
+        collection.set_array(values)
+        # Match GeoDataFrame.plot, which scales each frame to its own data range
+        if values.count():
+            collection.set_clim(values.min(), values.max())
+        _renderer["title"].set_text(f"{_renderer['variable']} @ {dt}")
+        frames.append(canvas_to_array(fig))
+    return frames
+
+def render_frames(init_fn, init_args, render_fn, items, desc):
+    # Contiguous chunks keep executor.map output in timestep order
+    workers = max(1, min(RENDER_WORKERS, len(items)))
+    chunk_size = max(1, -(-len(items) // (workers * 4)))
+    chunks = [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+
+    frames = []
+    if workers == 1:
+        init_fn(*init_args)
+        for chunk in tqdm(chunks, desc=desc):
+            frames.extend(render_fn(chunk))
+        return frames
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_fn, initargs=init_args) as pool:
+        for chunk_frames in tqdm(pool.map(render_fn, chunks), total=len(chunks), desc=desc):
+            frames.extend(chunk_frames)
+    return frames
+
+def generate_gif_for_variable(grid, data, variable):
     datetimes = sorted(data["datetime"].unique())
-    for dt in tqdm(datetimes, desc=f"Rendering {variable}"):
-        frame_data = data[data["datetime"] == dt][["cell_id", variable]]
-        merged = grid.merge(frame_data, on="cell_id", how="left")
-
-        fig, ax = plt.subplots(figsize=(8, 6))
-        merged.plot(column=variable, ax=ax, cmap="inferno", legend=True,
-                    legend_kwds={"shrink": 0.6}, edgecolor="none", missing_kwds={"color": "lightgrey"})
-        ax.set_title(f"{variable} @ {dt}", fontsize=12)
-        ax.axis("off")
-        fig.tight_layout()
-
-        frame_path = os.path.join(OUT_DIR, f"temp_{variable}_{dt}.png")
-        fig.savefig(frame_path, dpi=100)
-        plt.close(fig)
-        images.append(imageio.imread(frame_path))
-        os.remove(frame_path)
-
-    imageio.mimsave(gif_path, images, duration=0.5)
-    print(f"Saved GIF to {gif_path}")
+    values = frame_matrix(grid, data, variable, datetimes)
 
-def generate_hotspot_visualization(grid, data, output_gif="results/hotspots.gif"):
-    import imageio.v2 as imageio
-    from shapely.geometry import Point
-    import matplotlib.pyplot as plt
-    from tqdm import tqdm
-    import matplotlib.cm as cm
-    import numpy as np
-    import os
+    frames = render_frames(
+        _init_variable_renderer, (grid, variable), _render_variable_frames,
+        list(zip(datetimes, values)), f"Rendering {variable}",
+    )
+    save_animation(frames, os.path.join(OUT_DIR, variable))
+
+HOTSPOT_DECAY_STEPS = 10  # visible 3 timesteps + fade 7
+HALO_BUFFER_M = 300
+
+def hotspot_decay_frames(grid, data, datetimes):
+    # Decay state is one integer per grid row; new hotspots reset to full strength
+    hotspot = frame_matrix(grid, data, "hotspot", datetimes) == 1
+    decay = np.zeros(len(grid), dtype=np.int16)
+    intensities = np.empty(hotspot.shape, dtype=np.int16)
+    for i, new_hotspots in enumerate(hotspot):
+        decay[new_hotspots] = HOTSPOT_DECAY_STEPS
+        np.maximum(decay - 1, 0, out=decay)
+        intensities[i] = decay
+    return intensities
 
+def halo_frames(grid, intensities):
+    # Buffer every cell once, then only union the cells that change between frames
+    buffered = shapely.buffer(grid.geometry.values, HALO_BUFFER_M)
+    halos = []
+    halo = None
+    previous = np.zeros(len(grid), dtype=bool)
+    for active in intensities > 0:
+        if not active.any():
+            halo = None
+        elif halo is not None and np.array_equal(active, previous):
+            pass
+        elif halo is not None and not (previous & ~active).any():
+            halo = shapely.union(halo, shapely.union_all(buffered[active & ~previous]))
+        else:
+            halo = shapely.union_all(buffered[active])
+        previous = active
+        halos.append(halo)
+    return halos
+
+def _init_hotspot_renderer(grid, outline):
+    fig = Figure(figsize=(8, 6), dpi=100)
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+
+    grid.plot(ax=ax, color="lightgrey", edgecolor="none")
+    grid.plot(ax=ax, color="white", edgecolor="none")
+    collection = ax.collections[-1]
+    collection.set_cmap("Reds")
+    collection.set_clim(0, HOTSPOT_DECAY_STEPS)
+    # Keep the static outline above the per-frame halo, as in the original draw order
+    outline.plot(ax=ax, edgecolor="black", linewidth=0.5, zorder=1.1)
+
+    title = ax.set_title("Hotspots @ ")
+    ax.set_axis_off()
+    fig.tight_layout()
+
+    _renderer.update(fig=fig, ax=ax, collection=collection, title=title, halo=None, parts=part_index(grid))
+
+def _render_hotspot_frames(chunk):
+    fig = _renderer["fig"]
+    frames = []
+    for dt, intensity, halo in chunk:
+        _renderer["collection"].set_array(intensity[_renderer["parts"]].astype(float))
+        if _renderer["halo"] is not None:
+            _renderer["halo"].remove()
+            _renderer["halo"] = None
+        if halo is not None:
+            ax = gpd.GeoSeries([halo]).plot(ax=_renderer["ax"], facecolor="none", edgecolor="orange", linewidth=0.8)
+            _renderer["halo"] = ax.collections[-1]
+        _renderer["title"].set_text(f"Hotspots @ {dt}")
+        frames.append(canvas_to_array(fig))
+    return frames
+
+def generate_hotspot_visualization(grid, data, output_gif="results/hotspots.gif"):
     os.makedirs("results", exist_ok=True)
 
-    # Prepare decay tracking
     unique_timesteps = sorted(data["datetime"].unique())
-    decay_map = {}  # cell_id -> remaining_decay (max 10)
-
-    images = []
-
-    for i, dt in enumerate(tqdm(unique_timesteps, desc="Rendering hotspots")):
-        frame_data = data[data["datetime"] == dt]
-        new_hotspots = frame_data[frame_data["hotspot"] == 1]
-
-        # Update decay
-        for cid in new_hotspots["cell_id"]:
-            decay_map[cid] = 10  # visible 3 timesteps + fade 7
-
-        # Decay all values
-        for cid in list(decay_map):
-            decay_map[cid] -= 1
-            if decay_map[cid] <= 0:
-                del decay_map[cid]
-
-        # Assign visual intensity based on decay
-        grid_copy = grid.copy()
-        grid_copy["hotspot_intensity"] = grid_copy["cell_id"].map(decay_map).fillna(0)
-
-        # Optional: buffer + dissolve for cloud effect
-        cloud = grid_copy[grid_copy["hotspot_intensity"] > 0].copy()
-        if not cloud.empty:
-            cloud["geometry"] = cloud.buffer(300)  # 300m halo
-            cloud = cloud.dissolve()  # merge into single polygon
-
-        # Plot
-        fig, ax = plt.subplots(figsize=(8, 6))
-        base = grid.plot(ax=ax, color="lightgrey", edgecolor="none")
-        grid_copy.plot(
-            column="hotspot_intensity",
-            cmap="Reds",
-            ax=ax,
-            vmin=0,
-            vmax=10,
-            edgecolor="none",
-            legend=False,
-        )
-        if not cloud.empty:
-            cloud.plot(facecolor="none", edgecolor="orange", linewidth=0.8, ax=ax)
-
-        grid.dissolve().boundary.plot(ax=ax, edgecolor="black", linewidth=0.5)
-
-        ax.set_title(f"Hotspots @ {dt}")
-        ax.set_axis_off()
-        plt.tight_layout()
-
-        frame_path = f"results/output_gifs/frame_hotspot_{i:04d}.png"
-        fig.savefig(frame_path, dpi=100)
-        plt.close(fig)
-        images.append(imageio.imread(frame_path))
-        os.remove(frame_path)
-
-    imageio.mimsave(output_gif, images, duration=0.5)
-    print(f"Saved hotspot animation to {output_gif}")
+    intensities = hotspot_decay_frames(grid, data, unique_timesteps)
+    halos = halo_frames(grid, intensities)
+
+    # The study-area outline never changes, so dissolve it a single time
+    outline = grid.dissolve().boundary
 
+    frames = render_frames(
+        _init_hotspot_renderer, (grid, outline), _render_hotspot_frames,
+        list(zip(unique_timesteps, intensities, halos)), "Rendering hotspots",
+    )
+    save_animation(frames, os.path.splitext(output_gif)[0])
+
+
+def overlay_sensors(raster, frame, sensors):
+    if sensors is None:
+        return frame
+    for sensor_type, color in [("typical", "blue"), ("universal", "green"), ("base_station", "yellow")]:
+        subset = sensors[sensors["sensor_type"] == sensor_type]
+        raster.draw_points(frame, subset["x"].to_numpy(), subset["y"].to_numpy(), color,
+                           size_px=7 if sensor_type == "base_station" else 3)
+    return frame
+
+def generate_raster_gif_for_variable(raster, grid, data, variable, sensors=None):
+    # Pixels come straight from the cell-index image; no polygons are drawn
+    datetimes = sorted(data["datetime"].unique())
+    values = frame_matrix(grid, data, variable, datetimes)
+    frames = [overlay_sensors(raster, raster.colorize(v, cmap="inferno"), sensors)
+              for v in tqdm(values, desc=f"Rasterizing {variable}")]
+    save_animation(frames, os.path.join(OUT_DIR, variable))
+
+def generate_raster_hotspot_visualization(raster, grid, data, output_gif="results/hotspots.gif", sensors=None):
+    unique_timesteps = sorted(data["datetime"].unique())
+    intensities = hotspot_decay_frames(grid, data, unique_timesteps)
+
+    frames = []
+    for intensity in tqdm(intensities, desc="Rasterizing hotspots"):
+        frame = raster.colorize(intensity, cmap="Reds", vmin=0, vmax=HOTSPOT_DECAY_STEPS)
+        # Halo is the active-cell mask grown by the buffer distance, outlined in pixels
+        raster.draw_outline(frame, raster.cell_mask(intensity > 0), "orange", dilate_m=HALO_BUFFER_M)
+        raster.draw_outline(frame, raster.inside, "black")
+        frames.append(overlay_sensors(raster, frame, sensors))
+    save_animation(frames, os.path.splitext(output_gif)[0])
 
 def main():
     grid, data = load_data()
 
+    if RENDER_BACKEND == "raster":
+        raster = CellRaster.from_grid(grid, RASTER_RESOLUTION_M)
+        sensors = pd.read_csv(SENSOR_OVERLAY_CSV) if SENSOR_OVERLAY_CSV else None
+        for variable in VARIABLES:
+            if variable == "hotspot":
+                generate_raster_hotspot_visualization(raster, grid, data, sensors=sensors)
+            else:
+                generate_raster_gif_for_variable(raster, grid, data, variable, sensors=sensors)
+        return
+
     for variable in VARIABLES:
         if variable == "hotspot":
             generate_hotspot_visualization(grid, data)
@@ -0,0 +1,85 @@
+import os
+from typing import NamedTuple
+import numpy as np
+import pandas as pd
+
+# Per-link choice of data rate and transmit power. Each sensor gets the setting with the
+# lowest expected energy per delivered byte whose packet error rate (from the link margin
+# under log-normal shadowing) meets LINK_TARGET_PER; links that can't meet it get the
+# most robust setting. Selection is static: it uses the mean path loss of each link.
+LINK_ADAPTATION = os.getenv("LINK_ADAPTATION", "0") == "1"
+LINK_RATE_TABLE = os.getenv("LINK_RATE_TABLE")  # CSV with bitrate_bps,sensitivity_dbm; default below
+TX_POWER_LEVELS_DBM = [float(p) for p in os.getenv("TX_POWER_LEVELS_DBM", "2,5,8,11,14,17,20").split(",")]
+LINK_TARGET_PER = float(os.getenv("LINK_TARGET_PER", 0.1))
+PA_EFFICIENCY = float(os.getenv("PA_EFFICIENCY", 0.3))  # RF output / power amplifier draw
+RADIO_ACTIVE_W = float(os.getenv("RADIO_ACTIVE_W", 0.03))  # transceiver electronics while transmitting
+SHADOWING_STD_DB = 4.0  # as in compute_path_loss_db
+
+# LoRa-style spreading factors at 125 kHz: slower rates buy receiver sensitivity
+DEFAULT_RATE_TABLE = pd.DataFrame({
+    "bitrate_bps": [5470, 3125, 1760, 980, 440, 250],
+    "sensitivity_dbm": [-123.0, -126.0, -129.0, -132.0, -134.5, -137.0],
+})
+
+
+class LinkSetting(NamedTuple):
+    bitrate_bps: float
+    tx_power_dbm: float
+    sensitivity_dbm: float
+    supply_watts: float  # battery draw while transmitting
+
+
+def load_rate_table(path=LINK_RATE_TABLE):
+    return DEFAULT_RATE_TABLE.copy() if path is None else pd.read_csv(path)
+
+
+def supply_watts(tx_power_dbm):
+    return 10 ** (np.asarray(tx_power_dbm, dtype=float) / 10) / 1000 / PA_EFFICIENCY + RADIO_ACTIVE_W
+
+
+def packet_error_rate(margin_db, shadowing_std_db=SHADOWING_STD_DB):
+    # A packet is lost when shadowing eats the whole margin
+    from scipy.special import ndtr
+    return 1 - ndtr(np.asarray(margin_db, dtype=float) / shadowing_std_db)
+
+
+def select_link_settings(path_loss_db, rate_table=None, power_levels_dbm=TX_POWER_LEVELS_DBM,
+                         target_per=LINK_TARGET_PER):
+    """Best setting for every link at once (links x rates x powers); one row per link."""
+    table = load_rate_table() if rate_table is None else rate_table
+    bitrate = table["bitrate_bps"].to_numpy(dtype=float)
+    sensitivity = table["sensitivity_dbm"].to_numpy(dtype=float)
+    power = np.asarray(power_levels_dbm, dtype=float)
+
+    # Options flattened rate-major: option k = (rate k // len(power), power k % len(power))
+    opt_rate = np.repeat(np.arange(len(bitrate)), len(power))
+    opt_power = np.tile(power, len(bitrate))
+    loss = np.asarray(path_loss_db, dtype=float)[:, None]
+    margin = opt_power - loss - sensitivity[opt_rate]
+    per = packet_error_rate(margin)
+    with np.errstate(divide="ignore"):
+        energy_per_byte_mJ = supply_watts(opt_power) * 8 / bitrate[opt_rate] * 1000 / (1 - per)
+
+    feasible = per <= target_per
+    cost = np.where(feasible, energy_per_byte_mJ, np.inf)
+    best = cost.argmin(axis=1)
+    fallback = margin.argmax(axis=1)  # nothing meets the target: most margin
+    choice = np.where(feasible.any(axis=1), best, fallback)
+    links = np.arange(len(loss))
+    return pd.DataFrame({
+        "path_loss_db": loss[:, 0],
+        "bitrate_bps": bitrate[opt_rate[choice]],
+        "tx_power_dbm": opt_power[choice],
+        "sensitivity_dbm": sensitivity[opt_rate[choice]],
+        "supply_watts": supply_watts(opt_power[choice]),
+        "margin_db": margin[links, choice],
+        "expected_per": per[links, choice],
+        "energy_per_byte_mJ": energy_per_byte_mJ[links, choice],
+        "meets_target": feasible[links, choice],
+    })
+
+
+def link_settings(table):
+    # LinkSetting per row of select_link_settings()
+    return [LinkSetting(*row) for row in
+            table[["bitrate_bps", "tx_power_dbm", "sensitivity_dbm", "supply_watts"]].itertuples(index=False)]
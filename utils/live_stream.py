@@ -0,0 +1,261 @@
+import argparse
+import asyncio
+import csv
+import io
+import json
+import os
+import queue
+import threading
+import time
+import numpy as np
+import pandas as pd
+from utils.stream_simulation import ChunkReader, prepare_chunk
+
+# Live mode: the fleet steps on frames as they arrive from an async feed instead of
+# reading a finished event from the GeoPackage. Feeds carry fire_simulation_data rows as
+# CSV text (header first, rows in time order); a frame is complete at a blank line, when a
+# row with a later datetime arrives, or when the feed ends.
+LIVE_SOURCE = os.getenv("LIVE_SOURCE")  # "tail:<csv path>" or "tcp:<host>:<port>"; unset for batch runs
+FRAME_DEADLINE_S = float(os.getenv("FRAME_DEADLINE_S", 1.0))  # arrival -> transmissions emitted
+BACKLOG_POLICY = os.getenv("BACKLOG_POLICY", "coalesce")  # coalesce | drop | none (process every frame)
+TAIL_POLL_S = float(os.getenv("TAIL_POLL_S", 0.1))
+TAIL_IDLE_TIMEOUT_S = float(os.getenv("TAIL_IDLE_TIMEOUT_S", 10))  # a tailed file that stops growing ends the feed
+LIVE_TRANSMISSIONS = "results/live_transmissions.jsonl"
+
+_END = object()
+
+
+async def tail_lines(path, poll_s=TAIL_POLL_S, idle_timeout_s=TAIL_IDLE_TIMEOUT_S):
+    """Lines appended to path, like tail -f; stops after idle_timeout_s without new data."""
+    idle = 0.0
+    while not os.path.exists(path):
+        if idle >= idle_timeout_s:
+            return
+        await asyncio.sleep(poll_s)
+        idle += poll_s
+
+    partial = ""
+    with open(path) as f:
+        while True:
+            data = f.readline()
+            if data:
+                idle = 0.0
+                partial += data
+                if partial.endswith("\n"):  # the writer may be mid-line
+                    yield partial
+                    partial = ""
+                continue
+            if idle >= idle_timeout_s:
+                return
+            await asyncio.sleep(poll_s)
+            idle += poll_s
+
+
+async def socket_lines(host, port):
+    """Lines received from a TCP feed until the sender closes the connection."""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while line := await reader.readline():
+            yield line.decode()
+    finally:
+        writer.close()
+
+
+async def frames_from_lines(lines):
+    """Group CSV lines into one raw DataFrame per datetime."""
+    header, time_col = None, None
+    rows, current = [], None
+    async for line in lines:
+        if header is None:
+            header = line
+            time_col = next(csv.reader([line])).index("datetime")
+            continue
+        if not line.strip():  # end-of-frame marker: don't wait for the next frame's first row
+            if rows:
+                yield pd.read_csv(io.StringIO(header + "".join(rows)))
+            rows, current = [], None
+            continue
+        stamp = next(csv.reader([line]))[time_col]
+        if current is not None and stamp != current:
+            yield pd.read_csv(io.StringIO(header + "".join(rows)))
+            rows = []
+        current = stamp
+        rows.append(line)
+    if rows:
+        yield pd.read_csv(io.StringIO(header + "".join(rows)))
+
+
+def open_source(spec):
+    kind, _, target = spec.partition(":")
+    if kind == "tail":
+        return frames_from_lines(tail_lines(target))
+    if kind == "tcp":
+        host, _, port = target.rpartition(":")
+        return frames_from_lines(socket_lines(host, int(port)))
+    raise ValueError(f"Unknown live source {spec!r}; expected tail:<path> or tcp:<host>:<port>")
+
+
+def coalesce(frames):
+    # Latest values per cell; a hotspot seen in any of the merged frames is kept
+    latest = frames[-1].copy()
+    hot = pd.concat([f[["cell_id", "hotspot"]] for f in frames]).groupby("cell_id")["hotspot"].max()
+    latest["hotspot"] = latest["cell_id"].map(hot)
+    return latest
+
+
+class LiveFeed:
+    """Runs an async frame source on a background event loop and feeds the simulation loop.
+
+    frames() yields (time, merged frame) as frames arrive; the loop calls done() once a
+    frame's transmissions are known, which emits them and records its latency. When
+    frames queue up behind a slow step, the backlog is coalesced into one frame or all
+    but the newest are dropped (BACKLOG_POLICY).
+    """
+
+    def __init__(self, source, grid, transmissions_path=LIVE_TRANSMISSIONS, deadline_s=FRAME_DEADLINE_S,
+                 policy=BACKLOG_POLICY):
+        if policy not in ("coalesce", "drop", "none"):
+            raise ValueError(f"Unknown BACKLOG_POLICY {policy!r}")
+        self.grid = grid
+        self.deadline_s = deadline_s
+        self.policy = policy
+        self.stats = []
+        self._source = open_source(source) if isinstance(source, str) else source
+        self._queue = queue.Queue()
+        self._current = None
+        os.makedirs(os.path.dirname(transmissions_path) or ".", exist_ok=True)
+        self._sink = open(transmissions_path, "w")
+        self._thread = threading.Thread(target=lambda: asyncio.run(self._pump()), daemon=True)
+        self._thread.start()
+
+    async def _pump(self):
+        try:
+            async for frame in self._source:
+                self._queue.put((time.monotonic(), frame))
+        except Exception as exc:  # surfaced in the simulation thread
+            self._queue.put(exc)
+        self._queue.put(_END)
+
+    def _take(self, block):
+        item = self._queue.get(block=block)
+        if isinstance(item, Exception):
+            raise item
+        return item
+
+    def frames(self):
+        backlog = []
+        ended = False
+        while backlog or not ended:
+            if not backlog:
+                item = self._take(block=True)
+                if item is _END:
+                    break
+                backlog.append(item)
+            while not ended and not self._queue.empty():
+                item = self._take(block=False)
+                if item is _END:
+                    ended = True
+                else:
+                    backlog.append(item)
+
+            # Falling behind: more than one frame waiting when the fleet is ready
+            waiting = len(backlog)
+            if waiting > 1 and self.policy == "coalesce":
+                arrived, raw = backlog[0][0], coalesce([f for _, f in backlog])
+                backlog = []
+            elif waiting > 1 and self.policy == "drop":
+                arrived, raw = backlog[-1]
+                backlog = []
+            else:
+                arrived, raw = backlog.pop(0)
+
+            frame = prepare_chunk(self.grid, raw)
+            merged = waiting if self.policy == "coalesce" else 1
+            self._current = {"arrived": arrived, "waiting": waiting, "merged": merged,
+                             "dropped": waiting - 1 if self.policy == "drop" else 0}
+            yield pd.Timestamp(frame["datetime"].iloc[0]), frame
+        self._sink.close()
+
+    def done(self, timestep, transmissions):
+        """Emit a processed frame's transmissions and record its latency."""
+        for transmission in transmissions:
+            self._sink.write(json.dumps(transmission, default=_json_value) + "\n")
+        self._sink.flush()
+
+        latency = time.monotonic() - self._current["arrived"]
+        self.stats.append({"datetime": timestep, "latency_s": latency, "deadline_missed": latency > self.deadline_s,
+                           "frames_waiting": self._current["waiting"], "frames_coalesced": self._current["merged"],
+                           "frames_dropped": self._current["dropped"], "transmissions": len(transmissions)})
+
+    def table(self):
+        return pd.DataFrame(self.stats)
+
+    def summary(self):
+        stats = self.table()
+        if stats.empty:
+            return {}
+        return {
+            "frames_processed": len(stats),
+            "frames_dropped": int(stats["frames_dropped"].sum()),
+            "frames_coalesced": int((stats["frames_coalesced"] - 1).sum()),
+            "latency_p50_s": float(stats["latency_s"].median()),
+            "latency_p95_s": float(stats["latency_s"].quantile(0.95)),
+            "deadline_miss_rate": float(stats["deadline_missed"].mean()),
+        }
+
+    def save(self, output_dir):
+        os.makedirs(output_dir, exist_ok=True)
+        path = os.path.join(output_dir, "live_latency.csv")
+        self.table().to_csv(path, index=False)
+        return {"live_latency": path}
+
+
+def _json_value(value):
+    return value.item() if isinstance(value, np.generic) else str(value)
+
+
+async def replay_feed(gpkg_path, layer, start, end, target, interval_s):
+    """Stand-in producer: write the event's frames to a tailed CSV or serve them over TCP."""
+    reader = ChunkReader(gpkg_path, layer, start, end)
+    columns = [c for c in reader.columns or [] if c != "fid"]
+
+    async def lines():
+        yield ",".join(columns) + "\n"
+        while (chunk := reader.next_chunk()) is not None:
+            for _, frame in chunk.groupby("datetime", sort=True):
+                yield frame[columns].to_csv(index=False, header=False) + "\n"
+                await asyncio.sleep(interval_s)
+
+    kind, _, dest = target.partition(":")
+    if kind == "tail":
+        with open(dest, "w") as f:
+            async for text in lines():
+                f.write(text)
+                f.flush()
+    elif kind == "tcp":
+        host, _, port = dest.rpartition(":")
+        finished = asyncio.Event()
+
+        async def serve(_, writer):
+            async for text in lines():
+                writer.write(text.encode())
+                await writer.drain()
+            writer.close()
+            finished.set()
+
+        async with await asyncio.start_server(serve, host, int(port)):
+            await finished.wait()
+    reader.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay GeoPackage frames as a live feed for LIVE_SOURCE")
+    parser.add_argument("target", help="tail:<csv path> or tcp:<host>:<port>")
+    parser.add_argument("--gpkg", default="data/simulation.gpkg")
+    parser.add_argument("--layer", default="fire_simulation_data")
+    parser.add_argument("--start", default=os.getenv("SIM_START", "2016-05-01 00:00:00"))
+    parser.add_argument("--end", default=os.getenv("SIM_END", "2016-05-08 23:00:00"))
+    parser.add_argument("--interval", type=float, default=1.0, help="seconds between frames")
+    args = parser.parse_args()
+    asyncio.run(replay_feed(args.gpkg, args.layer, pd.Timestamp(args.start), pd.Timestamp(args.end),
+                            args.target, args.interval))
@@ -0,0 +1,91 @@
+import os
+import numpy as np
+from utils.sketches import MomentSketch, QuantileSketch
+
+# Statistics for report figures whose cost does not grow with the log beyond one
+# vectorized pass: binned FFT KDEs, sketch-based box plots and one-pass confidence
+# intervals. Results match seaborn/matplotlib's to plotting precision.
+
+KDE_GRIDSIZE = int(os.getenv("KDE_GRIDSIZE", 1024))  # evaluation/binning points per KDE
+BOX_MAX_FLIERS = int(os.getenv("BOX_MAX_FLIERS", 5000))  # outliers drawn per box; extremes always kept
+STATS_SAMPLE_ROWS = int(os.getenv("STATS_SAMPLE_ROWS", 0))  # >0: figures use at most this many rows per group
+STATS_SEED = 0
+
+
+def _finite(values):
+    values = np.asarray(values, dtype=float)
+    return values[np.isfinite(values)]
+
+
+def sample_values(values, max_rows=STATS_SAMPLE_ROWS, seed=STATS_SEED):
+    """Uniform sample of at most max_rows values (all of them when max_rows is 0)."""
+    values = np.asarray(values)
+    if max_rows <= 0 or len(values) <= max_rows:
+        return values
+    return np.random.default_rng(seed).choice(values, max_rows, replace=False)
+
+
+def scott_bandwidth(moments):
+    # scipy.stats.gaussian_kde's default, which seaborn uses: std * n ** (-1/5)
+    return moments.std(ddof=1) * moments.count ** (-1 / 5)
+
+
+def binned_kde(values, cut=3, gridsize=KDE_GRIDSIZE, bw_adjust=1.0):
+    """Gaussian KDE on an even grid from linear binning and one FFT convolution.
+
+    Support and bandwidth follow seaborn's kdeplot (cut=3; histplot uses cut=0).
+    Returns (support, density), or None when the data can't be smoothed.
+    """
+    values = _finite(values)
+    moments = MomentSketch().update(values)
+    if moments.count < 2 or not moments.var() > 0:
+        return None
+    bw = scott_bandwidth(moments) * bw_adjust
+    support = np.linspace(moments.min - cut * bw, moments.max + cut * bw, gridsize)
+    dx = support[1] - support[0]
+
+    # Linear binning: each value splits its weight between the two nearest grid points
+    pos = (values - support[0]) / dx
+    left = np.clip(np.floor(pos).astype(np.int64), 0, gridsize - 2)
+    frac = pos - left
+    counts = np.bincount(left, 1 - frac, gridsize) + np.bincount(left + 1, frac, gridsize)
+
+    # Convolve with the kernel sampled at every grid offset (zero-padded, so no wrap-around)
+    offsets = np.arange(-(gridsize - 1), gridsize) * dx
+    kernel = np.exp(-0.5 * (offsets / bw) ** 2) / (bw * np.sqrt(2 * np.pi))
+    size = 1 << int(np.ceil(np.log2(3 * gridsize)))
+    conv = np.fft.irfft(np.fft.rfft(counts, size) * np.fft.rfft(kernel, size), size)
+    density = conv[gridsize - 1:2 * gridsize - 1] / moments.count
+    return support, np.maximum(density, 0)
+
+
+def box_stats(values, label, whis=1.5, max_fliers=BOX_MAX_FLIERS, seed=STATS_SEED):
+    """matplotlib.cbook.boxplot_stats for one group, with quantiles from a QuantileSketch.
+
+    Whisker ends and outliers take one vectorized pass; at most max_fliers outliers are
+    kept (a random sample plus both extremes).
+    """
+    values = _finite(values)
+    if len(values) == 0:
+        return {"label": label, "med": np.nan, "q1": np.nan, "q3": np.nan, "whislo": np.nan, "whishi": np.nan,
+                "mean": np.nan, "fliers": np.empty(0)}
+    q1, med, q3 = QuantileSketch().update(values).quantile([0.25, 0.5, 0.75])
+    iqr = q3 - q1
+    inside = values[(values >= q1 - whis * iqr) & (values <= q3 + whis * iqr)]
+    whislo = inside.min() if len(inside) else q1
+    whishi = inside.max() if len(inside) else q3
+    fliers = values[(values < whislo) | (values > whishi)]
+    if len(fliers) > max_fliers:
+        extremes = [fliers.min(), fliers.max()]
+        fliers = np.r_[extremes, np.random.default_rng(seed).choice(fliers, max_fliers - 2, replace=False)]
+    return {"label": label, "med": med, "q1": q1, "q3": q3, "whislo": whislo, "whishi": whishi,
+            "mean": values.mean(), "fliers": fliers}
+
+
+def mean_ci95(values):
+    """Normal-approximation 95% interval of the mean from one pass of moments."""
+    moments = values if isinstance(values, MomentSketch) else MomentSketch().update(values)
+    if moments.count == 0:
+        return np.nan, np.nan
+    margin = 1.96 * moments.std(ddof=1) / np.sqrt(moments.count)
+    return moments.mean - margin, moments.mean + margin
@@ -0,0 +1,152 @@
+import os
+import numpy as np
+import pandas as pd
+
+# Shared uplink channel to the base station
+MAC_MODE = os.getenv("MAC_MODE", "none")  # none (private channels), aloha, csma, tdma
+MAC_MAX_RETRIES = int(os.getenv("MAC_MAX_RETRIES", 3))
+MAC_BACKOFF_S = float(os.getenv("MAC_BACKOFF_S", 2.0))  # initial backoff window, doubled per retry
+CSMA_SENSE_S = float(os.getenv("CSMA_SENSE_S", 0.01))  # carrier-sense/turnaround vulnerable window
+TDMA_SLOT_S = float(os.getenv("TDMA_SLOT_S", 0.5))  # one slot per sensor in each frame
+MAC_MODES = ["none", "aloha", "csma", "tdma"]
+
+
+def overlapping(start, end):
+    """Flag intervals that overlap any other interval (vectorized sweep over sorted starts)."""
+    order = np.argsort(start, kind="stable")
+    s, e = start[order], end[order]
+    prev_end = np.r_[-np.inf, np.maximum.accumulate(e)[:-1]]
+    next_start = np.r_[s[1:], np.inf]
+    hit = np.empty(len(start), dtype=bool)
+    hit[order] = (s < prev_end) | (e > next_start)
+    return hit
+
+
+def fifo_starts(arrival, duration):
+    # Lindley recursion start_i = max(arrival_i, end_{i-1}) in closed form, for arrival-sorted packets
+    served = np.cumsum(duration)
+    backlog = np.maximum.accumulate(arrival - (served - duration))
+    return backlog + served - duration
+
+
+class UplinkChannel:
+    """Schedules each step's transmissions on one shared channel.
+
+    schedule() updates the transmission dicts in place: energy_used_mJ includes every
+    attempt, and mac_attempts, mac_delivered and mac_delay_sec are added. Channel load,
+    collisions and utilization are kept per step for channel_table().
+    """
+
+    def __init__(self, sensor_count, mode=MAC_MODE, seed=None, max_retries=MAC_MAX_RETRIES,
+                 backoff_s=MAC_BACKOFF_S, sense_s=CSMA_SENSE_S, slot_s=TDMA_SLOT_S):
+        if mode not in MAC_MODES:
+            raise ValueError(f"MAC_MODE must be one of {MAC_MODES}, got {mode!r}")
+        self.mode = mode
+        self.sensor_count = sensor_count
+        self.rng = np.random.default_rng(seed)  # separate from np.random so sensors see the same draws
+        self.max_retries = max_retries
+        self.backoff_s = backoff_s
+        self.sense_s = sense_s
+        self.slot_s = slot_s
+        self.stats = []
+
+    def schedule(self, timestep, step_hours, transmissions, positions):
+        """Run one step's transmissions (dicts) from sensors at the given fleet positions."""
+        if self.mode == "none" or not transmissions:
+            return
+        window_s = step_hours * 3600
+        airtime = np.array([t["tx_time_sec"] for t in transmissions], dtype=float)
+        energy = np.array([t["energy_used_mJ"] for t in transmissions], dtype=float)
+        arrival = self.rng.uniform(0, window_s, len(airtime))
+
+        if self.mode == "tdma":
+            attempts, delivered, done = self._tdma(arrival, airtime, np.asarray(positions))
+        else:
+            attempts, delivered, done = self._contention(arrival, airtime)
+
+        delay = done - arrival
+        for t, n, ok, d in zip(transmissions, attempts, delivered, delay):
+            t["energy_used_mJ"] = t["energy_used_mJ"] * int(n)
+            t["mac_attempts"] = int(n)
+            t["mac_delivered"] = bool(ok)
+            t["mac_delay_sec"] = float(d) if ok else np.nan
+
+        self.stats.append({
+            "datetime": timestep,
+            "offered": len(airtime),
+            "delivered": int(delivered.sum()),
+            "collided_attempts": int((attempts - delivered).sum()),
+            "retransmission_energy_mJ": float((energy * (attempts - 1)).sum()),
+            "utilization": float((airtime * attempts).sum() / window_s),
+            "mean_delay_sec": float(delay[delivered].mean()) if delivered.any() else np.nan,
+        })
+
+    def _contention(self, arrival, airtime):
+        # Collided packets back off (binary exponential window) and retry up to max_retries
+        n = len(airtime)
+        attempts = np.ones(n, dtype=int)
+        start = arrival.copy()
+        done = np.full(n, np.nan)
+        delivered = np.zeros(n, dtype=bool)
+        pending = np.arange(n)
+        starts, ends = [], []
+
+        for retry in range(self.max_retries + 1):
+            if self.mode == "csma":
+                collided, start[pending] = self._csma_round(start[pending], airtime[pending])
+            else:
+                # ALOHA: a new attempt fails if it overlaps any attempt on the channel so far
+                # (earlier outcomes are kept as decided)
+                starts.append(start[pending])
+                ends.append(start[pending] + airtime[pending])
+                hit = overlapping(np.concatenate(starts), np.concatenate(ends))
+                collided = hit[len(hit) - len(pending):]
+
+            ok = pending[~collided]
+            delivered[ok] = True
+            done[ok] = start[ok] + airtime[ok]
+
+            pending = pending[collided]
+            if len(pending) == 0 or retry == self.max_retries:
+                break
+            backoff = self.rng.uniform(0, self.backoff_s * 2**retry, len(pending))
+            start[pending] = start[pending] + airtime[pending] + backoff
+            attempts[pending] += 1
+
+        return attempts, delivered, done
+
+    def _csma_round(self, arrival, airtime):
+        # Packets that find the channel busy defer and are served in arrival order; a
+        # packet arriving within sense_s of the previous start cannot hear it yet, so it
+        # transmits at once and both collide
+        order = np.argsort(arrival, kind="stable")
+        a, d = arrival[order], airtime[order]
+        start = fifo_starts(a, d)
+        blind = np.r_[False, (a[1:] >= start[:-1]) & (a[1:] < start[:-1] + self.sense_s)]
+        start[blind] = a[blind]
+        collided = blind | np.r_[blind[1:], False]
+
+        inverse = np.empty_like(order)
+        inverse[order] = np.arange(len(order))
+        return collided[inverse], start[inverse]
+
+    def _tdma(self, arrival, airtime, positions):
+        # Fixed frame with one slot per sensor; a packet waits for its own slot and
+        # takes as many frames as it needs slots
+        frame_s = self.sensor_count * self.slot_s
+        offset = positions * self.slot_s
+        wait = (offset - arrival) % frame_s
+        slots_needed = np.ceil(airtime / self.slot_s)
+        done = arrival + wait + (slots_needed - 1) * frame_s + airtime - (slots_needed - 1) * self.slot_s
+        return np.ones(len(airtime), dtype=int), np.ones(len(airtime), dtype=bool), done
+
+    def channel_table(self):
+        return pd.DataFrame(self.stats)
+
+    def save(self, output_dir):
+        if self.mode == "none":
+            return {}
+        os.makedirs(output_dir, exist_ok=True)
+        path = os.path.join(output_dir, "mac_channel.csv")
+        self.channel_table().to_csv(path, index=False)
+        return {"mac_channel": path}
@@ -0,0 +1,103 @@
+import os
+import numpy as np
+import pandas as pd
+
+# Metrics accumulated while the simulation runs, so summaries don't need the raw logs
+METRICS_DIR = os.getenv("METRICS_DIR", "results/metrics")
+DISTANCE_BAND_KM = float(os.getenv("DISTANCE_BAND_KM", 1.0))  # width of the distance-to-base bands
+DIMENSIONS = ["sensor_type", "sensor", "hour", "distance_band"]
+
+# Per-group counters, in the order they are stored
+_FIELDS = ["readings", "hotspot_readings", "transmissions", "hotspot_transmissions",
+           "data_bytes", "energy_mJ", "sampling_rate_sum", "sampling_rate_n"]
+_READINGS, _HOT_READINGS, _TX, _HOT_TX, _BYTES, _ENERGY, _RATE_SUM, _RATE_N = range(len(_FIELDS))
+
+
+class MetricsAggregator:
+    """Incremental transmission/energy/coverage counters by sensor type, sensor, hour and distance band.
+
+    Call register_sensor() once per sensor, then record() for every logged reading with
+    the transmission it produced (or None). Hotspot coverage is the share of hotspot
+    readings that were transmitted in the same step.
+    """
+
+    def __init__(self, base_x, base_y, band_km=DISTANCE_BAND_KM):
+        self.base_x = base_x
+        self.base_y = base_y
+        self.band_km = band_km
+        self._sensors = {}  # sensor_id -> (sensor_type, distance_km, band)
+        self._groups = {dim: {} for dim in DIMENSIONS}
+
+    def register_sensor(self, sensor_id, sensor_type, x, y):
+        distance_km = np.hypot(x - self.base_x, y - self.base_y) / 1000
+        band = int(distance_km // self.band_km)
+        self._sensors[sensor_id] = (sensor_type, distance_km, band)
+
+    def _accumulators(self, sensor_id, hour):
+        sensor_type, _, band = self._sensors[sensor_id]
+        keys = {"sensor_type": sensor_type, "sensor": sensor_id, "hour": hour, "distance_band": band}
+        for dim in DIMENSIONS:
+            groups = self._groups[dim]
+            acc = groups.get(keys[dim])
+            if acc is None:
+                acc = groups[keys[dim]] = [0] * len(_FIELDS)
+            yield acc
+
+    def record(self, sensor_id, hour, hotspot, transmission=None):
+        hot = hotspot == 1
+        for acc in self._accumulators(sensor_id, hour):
+            acc[_READINGS] += 1
+            acc[_HOT_READINGS] += hot
+            if transmission is None:
+                continue
+            acc[_TX] += 1
+            acc[_HOT_TX] += hot and transmission.get("mac_delivered", True)  # lost packets don't cover
+            acc[_BYTES] += transmission["data_sent_bytes"]
+            acc[_ENERGY] += transmission["energy_used_mJ"]
+            rate = transmission.get("sampling_rate")
+            if rate is not None:
+                acc[_RATE_SUM] += rate
+                acc[_RATE_N] += 1
+
+    def table(self, dim):
+        groups = self._groups[dim]
+        df = pd.DataFrame(list(groups.values()), columns=_FIELDS, index=pd.Index(list(groups.keys()), name=dim))
+        df = df.sort_index()
+
+        tx = df["transmissions"].where(df["transmissions"] > 0)
+        df["avg_energy_per_tx_mJ"] = df["energy_mJ"] / tx
+        df["avg_tx_bytes"] = df["data_bytes"] / tx
+        df["avg_sampling_rate"] = df["sampling_rate_sum"] / df["sampling_rate_n"].where(df["sampling_rate_n"] > 0)
+        df["hotspot_coverage"] = df["hotspot_transmissions"] / df["hotspot_readings"].where(df["hotspot_readings"] > 0)
+        df = df.drop(columns=["sampling_rate_sum", "sampling_rate_n"])
+
+        if dim == "sensor":
+            meta = pd.DataFrame.from_dict(self._sensors, orient="index", columns=["sensor_type", "distance_km", "distance_band"])
+            df = meta.join(df, how="right")
+            df.index.name = "sensor_id"
+        elif dim == "distance_band":
+            df.insert(0, "band_start_km", df.index * self.band_km)
+        return df.reset_index()
+
+    def run_metrics(self, sensor_type="universal"):
+        # Same headline keys as utils.run_metrics.compute_run_metrics, for runs without raw logs
+        row = self.table("sensor_type").set_index("sensor_type")
+        if sensor_type not in row.index:
+            return {}
+        row = row.loc[sensor_type]
+        return {
+            "transmissions": int(row["transmissions"]),
+            "energy_j": row["energy_mJ"] / 1000,
+            "avg_sampling_rate": float(row["avg_sampling_rate"]),
+            "hotspot_recovery_rate": 0 if np.isnan(row["hotspot_coverage"]) else row["hotspot_coverage"],
+        }
+
+    def save(self, output_dir=METRICS_DIR):
+        """Write one summary CSV per dimension; returns {table name: path}."""
+        os.makedirs(output_dir, exist_ok=True)
+        written = {}
+        for dim in DIMENSIONS:
+            path = os.path.join(output_dir, f"summary_by_{dim}.csv")
+            self.table(dim).to_csv(path, index=False)
+            written[f"summary_by_{dim}"] = path
+        return written
@@ -0,0 +1,23 @@
+import time
+
+# Wall time of a run split into phases. lap(phase) charges the time since the previous
+# lap to phase, so per-step phases inside the simulation loop accumulate over the run
+# at the cost of one perf_counter() call each.
+
+
+class PhaseTimer:
+    def __init__(self):
+        self.seconds = {}
+        self.counts = {}
+        self._mark = time.perf_counter()
+
+    def lap(self, phase):
+        now = time.perf_counter()
+        self.seconds[phase] = self.seconds.get(phase, 0.0) + now - self._mark
+        self._mark = now
+
+    def count(self, name, n=1):
+        self.counts[name] = self.counts.get(name, 0) + n
+
+    def total(self):
+        return sum(self.seconds.values())
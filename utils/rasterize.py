@@ -0,0 +1,97 @@
+import os
+import numpy as np
+import shapely
+import matplotlib.pyplot as plt
+from matplotlib.colors import Normalize, to_rgba
+from scipy import ndimage
+
+# Config
+RASTER_WIDTH_PX = int(os.getenv("RASTER_WIDTH_PX", 800))  # used when no resolution is given
+BACKGROUND_COLOR = (255, 255, 255, 255)
+
+
+class CellRaster:
+    """Cell-index image: each pixel holds the grid row it falls in, or -1 outside the grid."""
+
+    def __init__(self, index, extent):
+        self.index = index
+        self.extent = extent  # (minx, maxx, miny, maxy), north-up like imshow
+        self.height, self.width = index.shape
+        self.resolution = (extent[1] - extent[0]) / self.width
+        self.inside = index >= 0
+
+    @classmethod
+    def from_grid(cls, grid, resolution_m=None):
+        minx, miny, maxx, maxy = grid.total_bounds
+        if resolution_m is None:
+            resolution_m = (maxx - minx) / RASTER_WIDTH_PX
+        width = int(np.ceil((maxx - minx) / resolution_m))
+        height = int(np.ceil((maxy - miny) / resolution_m))
+
+        # Pixel centres, top row first
+        xs = minx + (np.arange(width) + 0.5) * resolution_m
+        ys = maxy - (np.arange(height) + 0.5) * resolution_m
+        xx, yy = np.meshgrid(xs, ys)
+
+        tree = shapely.STRtree(grid.geometry.values)
+        pixel_idx, cell_idx = tree.query(shapely.points(xx.ravel(), yy.ravel()), predicate="within")
+
+        index = np.full(width * height, -1, dtype=np.int32)
+        index[pixel_idx] = cell_idx
+        extent = (minx, minx + width * resolution_m, maxy - height * resolution_m, maxy)
+        return cls(index.reshape(height, width), extent)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as cached:
+            return cls(cached["index"], tuple(cached["extent"]))
+
+    def save(self, path):
+        np.savez_compressed(path, index=self.index, extent=np.asarray(self.extent))
+
+    def colorize(self, values, cmap="inferno", vmin=None, vmax=None, missing_color="lightgrey"):
+        # Colour each cell once, then expand to pixels with a single fancy-index
+        values = np.asarray(values, dtype=float)
+        finite = np.isfinite(values)
+        if vmin is None:
+            vmin = values[finite].min() if finite.any() else 0.0
+        if vmax is None:
+            vmax = values[finite].max() if finite.any() else 1.0
+
+        cmap = plt.get_cmap(cmap)
+        lut = np.empty((len(values) + 1, 4), dtype=np.uint8)
+        lut[:-1] = cmap(Normalize(vmin, vmax)(values), bytes=True)
+        lut[:-1][~finite] = np.asarray(to_rgba(missing_color)) * 255
+        lut[-1] = BACKGROUND_COLOR
+        return lut[self.index]  # index -1 picks the background row
+
+    def to_pixels(self, x, y):
+        col = ((np.asarray(x) - self.extent[0]) / self.resolution).astype(int)
+        row = ((self.extent[3] - np.asarray(y)) / self.resolution).astype(int)
+        return row, col
+
+    def draw_points(self, rgba, x, y, color, size_px=3):
+        # Stamp square markers (e.g. sensors) into an RGBA frame in place
+        row, col = self.to_pixels(x, y)
+        color = (np.asarray(to_rgba(color)) * 255).astype(np.uint8)
+        half = size_px // 2
+        for dr in range(-half, size_px - half):
+            for dc in range(-half, size_px - half):
+                r, c = row + dr, col + dc
+                ok = (r >= 0) & (r < self.height) & (c >= 0) & (c < self.width)
+                rgba[r[ok], c[ok]] = color
+        return rgba
+
+    def draw_outline(self, rgba, mask, color, dilate_m=0.0):
+        # Outline a pixel mask, optionally grown by a buffer distance first
+        if dilate_m > 0 and mask.any():
+            # Distance transform keeps large buffers linear in the pixel count
+            mask = ndimage.distance_transform_edt(~mask) <= dilate_m / self.resolution
+        edge = mask & ~ndimage.binary_erosion(mask)
+        rgba[edge] = (np.asarray(to_rgba(color)) * 255).astype(np.uint8)
+        return rgba
+
+    def cell_mask(self, cell_flags):
+        # Pixel mask of the grid rows flagged True
+        flags = np.append(np.asarray(cell_flags, dtype=bool), False)
+        return flags[self.index]
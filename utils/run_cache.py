@@ -0,0 +1,282 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+import pandas as pd
+
+# CONFIG
+CACHE_DIR = os.getenv("RUN_CACHE_DIR", "results/run_cache")
+CACHE_MAX_BYTES = int(float(os.getenv("RUN_CACHE_MAX_MB", 2048)) * 1024**2)
+CACHE_ENABLED = os.getenv("RUN_CACHE", "1") != "0"
+FINGERPRINT_INDEX = os.path.join(CACHE_DIR, "fingerprints.json")
+
+# Environment variables that change what a simulation run produces
+SIM_PARAM_VARS = [
+    "KL_THRESHOLD",
+    "ERROR_HISTORY",
+    "CONTROL_ERROR_THRESHOLD",
+    "SAMPLING_RATE_MIN",
+    "SAMPLING_RATE_MAX",
+    "WRITE_RAW_LOGS",
+    "DISTANCE_BAND_KM",
+    "SUBSTEPS_PER_HOUR",
+    "BATTERY_CAPACITY_J",
+    "SENSE_ENERGY_MJ",
+    "IDLE_POWER_MW",
+    "MAC_MODE",
+    "MAC_MAX_RETRIES",
+    "MAC_BACKOFF_S",
+    "CSMA_SENSE_S",
+    "TDMA_SLOT_S",
+    "SUPPRESSION",
+    "SUPPRESSION_RADIUS_M",
+    "COORDINATION_ENERGY_MJ",
+    "SUPPRESS_TEMPERATURE_TOL",
+    "SUPPRESS_WIND_SPEED_TOL",
+    "SUPPRESS_HUMIDITY_TOL",
+    "COMPACT_SCHEMA",
+    "WRITE_SENSING_TRACE",
+    "TERRAIN_PATH_LOSS",
+    "TERRAIN_SAMPLES",
+    "TERRAIN_RESOLUTION_M",
+    "FREQUENCY_MHZ",
+    "SENSOR_ANTENNA_M",
+    "BASE_ANTENNA_M",
+    "LINK_ADAPTATION",
+    "LINK_RATE_TABLE",
+    "TX_POWER_LEVELS_DBM",
+    "LINK_TARGET_PER",
+    "PA_EFFICIENCY",
+    "RADIO_ACTIVE_W",
+]
+
+# Source whose edits must not be served from old results: the simulation entry point and
+# every module it can import (whole packages, so new or indirect dependencies are covered)
+SIM_CODE_PATHS = ["scripts/run_simulation.py", "sensors", "utils"]
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _read_json(path):
+    # None when the file is missing, or torn / corrupt from a crashed writer
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_json(path, data, **kwargs):
+    # Write a sibling temp file and rename it over path, so concurrent readers see the old
+    # or the new content, never a partial file
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f, **kwargs)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def file_fingerprint(path):
+    # Content hash, memoised on (size, mtime) so multi-GB inputs are hashed once
+    stat = os.stat(path)
+    abs_path = os.path.abspath(path)
+    cached = (_read_json(FINGERPRINT_INDEX) or {}).get(abs_path)
+    if cached and cached["size"] == stat.st_size and cached["mtime_ns"] == stat.st_mtime_ns:
+        return cached["sha256"]
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+
+    # Re-read just before writing so entries other workers added while we hashed survive
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    index = _read_json(FINGERPRINT_INDEX) or {}
+    index[abs_path] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": digest.hexdigest()}
+    _write_json(FINGERPRINT_INDEX, index)
+    return digest.hexdigest()
+
+
+def sim_code_files():
+    files = []
+    for rel_path in SIM_CODE_PATHS:
+        path = os.path.join(REPO_ROOT, rel_path)
+        if os.path.isfile(path):
+            files.append(rel_path)
+            continue
+        for root, dirs, names in os.walk(path):
+            dirs[:] = [d for d in dirs if d != "__pycache__"]
+            files += [os.path.relpath(os.path.join(root, n), REPO_ROOT) for n in names if n.endswith(".py")]
+    return sorted(files)
+
+
+def code_fingerprint():
+    digest = hashlib.sha256()
+    for rel_path in sim_code_files():
+        digest.update(rel_path.encode())
+        with open(os.path.join(REPO_ROOT, rel_path), "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def sensor_params_from_env(env=os.environ):
+    return {name: env[name] for name in SIM_PARAM_VARS if name in env}
+
+
+def run_key(sim_gpkg, sensor_csv, start, end, seed, params=None):
+    """Hash of everything that determines a run's output."""
+    spec = {
+        "simulation_input": file_fingerprint(sim_gpkg),
+        "sensor_deployment": file_fingerprint(sensor_csv),
+        "sensor_params": params if params is not None else sensor_params_from_env(),
+        "start": str(pd.Timestamp(start)),
+        "end": str(pd.Timestamp(end)),
+        "seed": None if seed is None else int(seed),
+        "code": code_fingerprint(),
+    }
+    return hashlib.sha256(json.dumps(spec, sort_keys=True).encode()).hexdigest()
+
+
+def _entry_dir(key):
+    return os.path.join(CACHE_DIR, key)
+
+
+def _read_meta(key):
+    return _read_json(os.path.join(_entry_dir(key), "meta.json"))
+
+
+def _write_meta(key, meta):
+    _write_json(os.path.join(_entry_dir(key), "meta.json"), meta, indent=2, default=str)
+
+
+def lookup(key):
+    # Returns the cached metrics (and marks the entry as recently used) or None
+    if not CACHE_ENABLED:
+        return None
+    meta = _read_meta(key)
+    if meta is None:
+        return None
+    meta["last_used"] = time.time()
+    try:
+        _write_meta(key, meta)
+    except FileNotFoundError:  # evicted by another worker since the read
+        return None
+    return meta
+
+
+def restore(key, targets):
+    """Copy a hit's logs to {log name: destination path}; returns its metrics or None on a miss.
+
+    Targets the cached run did not write are removed, so a leftover file from another
+    run can't pass for its output. An entry evicted by another worker part-way through
+    counts as a miss; the caller's fresh run then rewrites every target.
+    """
+    meta = lookup(key)
+    if meta is None:
+        return None
+    for name, path in targets.items():
+        stored = meta["logs"].get(name)
+        if stored:
+            try:
+                shutil.copyfile(os.path.join(_entry_dir(key), os.path.basename(stored)), path)
+                continue
+            except FileNotFoundError:
+                return None
+        if os.path.exists(path):
+            os.remove(path)
+    return meta["metrics"]
+
+
+def store(key, metrics, logs, description=None):
+    """Save a finished run's metrics and {log name: path} files, then enforce the size cap."""
+    if not CACHE_ENABLED:
+        return
+    # Build the entry in a private directory and rename it into place, so no reader sees
+    # an entry with meta.json but missing logs
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    staging = tempfile.mkdtemp(dir=CACHE_DIR, prefix=".tmp-")
+    try:
+        stored = {}
+        for name, path in logs.items():
+            if os.path.exists(path):
+                shutil.copyfile(path, os.path.join(staging, os.path.basename(path)))
+                stored[name] = os.path.basename(path)
+        now = time.time()
+        _write_json(os.path.join(staging, "meta.json"),
+                    {"metrics": metrics, "logs": stored, "description": description or {},
+                     "created": now, "last_used": now}, indent=2, default=str)
+        shutil.rmtree(_entry_dir(key), ignore_errors=True)
+        try:
+            os.rename(staging, _entry_dir(key))
+        except OSError:  # another worker stored the same run first; keep theirs
+            pass
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+    evict()
+
+
+def _entries():
+    if not os.path.isdir(CACHE_DIR):
+        return []
+    entries = []
+    for key in os.listdir(CACHE_DIR):
+        if key.startswith("."):  # an entry still being built by store()
+            continue
+        meta = _read_meta(key)
+        if meta is None:
+            continue
+        try:
+            size = sum(f.stat().st_size for f in os.scandir(_entry_dir(key)) if f.is_file())
+        except FileNotFoundError:  # evicted while we listed
+            continue
+        entries.append({"key": key, "size": size, **meta})
+    return entries
+
+
+def evict(max_bytes=CACHE_MAX_BYTES):
+    # Least recently used entries go first
+    entries = sorted(_entries(), key=lambda e: e["last_used"])
+    total = sum(e["size"] for e in entries)
+    removed = []
+    while entries and total > max_bytes:
+        entry = entries.pop(0)
+        shutil.rmtree(_entry_dir(entry["key"]), ignore_errors=True)
+        total -= entry["size"]
+        removed.append(entry["key"])
+    return removed
+
+
+def invalidate(key=None):
+    # Drop one entry, or the whole cache (including input fingerprints) when no key is given
+    if key is not None:
+        shutil.rmtree(_entry_dir(key), ignore_errors=True)
+        return [key]
+    keys = [e["key"] for e in _entries()]
+    shutil.rmtree(CACHE_DIR, ignore_errors=True)
+    return keys
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect or clear the simulation run cache")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list", help="show cached runs")
+    clear = sub.add_parser("clear", help="invalidate one run or the whole cache")
+    clear.add_argument("--key", help="cache key to drop (default: everything)")
+    shrink = sub.add_parser("evict", help="evict least recently used runs down to a size")
+    shrink.add_argument("--max-mb", type=float, default=CACHE_MAX_BYTES / 1024**2)
+    args = parser.parse_args()
+
+    if args.command == "list":
+        for e in sorted(_entries(), key=lambda e: e["last_used"], reverse=True):
+            print(f"{e['key'][:16]}  {e['size'] / 1024**2:8.1f} MB  {e['description']}")
+    elif args.command == "clear":
+        print(f"Invalidated {len(invalidate(args.key))} cached run(s)")
+    else:
+        print(f"Evicted {len(evict(int(args.max_mb * 1024**2)))} cached run(s)")
@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+from utils.detection_latency import detection_latency, summarize_latency
+from utils.schema import read_log
+
+RESULT_CSV = "results/experiment_log_combined.csv"
+TRANSMISSION_CSV = "results/transmission_log_combined.csv"
+
+
+def load_run_logs(result_csv=RESULT_CSV, transmission_csv=TRANSMISSION_CSV, sensor_type="universal"):
+    exp_log = read_log(result_csv, "experiment")
+    tx_log = read_log(transmission_csv, "transmission")
+    return tx_log[tx_log["sensor_type"] == sensor_type].copy(), exp_log[exp_log["sensor_type"] == sensor_type].copy()
+
+
+def compute_run_metrics(tx_log, exp_log, onsets=None, sensor_df=None):
+    # Headline metrics for one run; latency needs the onsets and deployment table
+    transmissions = len(tx_log)
+    total_energy_j = tx_log["energy_used_mJ"].sum() / 1000
+    avg_sampling_rate = float(tx_log["sampling_rate"].mean()) if "sampling_rate" in tx_log else np.nan
+
+    # Packets lost on a shared channel (MAC_MODE) cost energy but don't reach the base
+    if "mac_delivered" in tx_log:
+        tx_log = tx_log[tx_log["mac_delivered"].fillna(True).astype(bool)]
+
+    # Hotspot recovery; timestamps are normalised because the logs format them differently
+    exp_key = exp_log["sensor_id"].astype(str) + "_" + pd.to_datetime(exp_log["datetime"]).astype(str)
+    tx_key = tx_log["sensor_id"].astype(str) + "_" + pd.to_datetime(tx_log["timestamp"]).astype(str)
+    transmitted = exp_key.isin(tx_key)
+
+    hotspots = exp_log["hotspot"] == 1
+    hotspot_total = int(hotspots.sum())
+    hotspot_transmitted = int((transmitted & hotspots).sum())
+
+    metrics = {
+        "transmissions": transmissions,
+        "energy_j": total_energy_j,
+        "avg_sampling_rate": avg_sampling_rate,
+        "hotspot_recovery_rate": hotspot_transmitted / hotspot_total if hotspot_total > 0 else 0,
+    }
+
+    if onsets is not None and sensor_df is not None:
+        latency = summarize_latency(detection_latency(onsets, sensor_df, tx_log))
+        metrics.update({
+            "detection_rate": latency["detection_rate"],
+            "latency_median_h": latency["latency_median_h"],
+            "latency_p90_h": latency["latency_p90_h"],
+            "missed_onsets": latency["missed"],
+        })
+    return metrics
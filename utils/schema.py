@@ -0,0 +1,132 @@
+import os
+import numpy as np
+import pandas as pd
+
+# Compact in-memory schema for simulation data and logs; COMPACT_SCHEMA=0 keeps pandas defaults
+COMPACT_SCHEMA = os.getenv("COMPACT_SCHEMA", "1") != "0"
+
+SIMULATION_DTYPES = {
+    "cell_id": "int32",
+    "elevation": "float32",
+    "temperature": "float32",
+    "wind_speed": "float32",
+    "relative_humidity": "float32",
+    "hotspot": "int8",
+    "fwi": "float32",
+}
+
+_ENV_DTYPES = {k: SIMULATION_DTYPES[k] for k in ["temperature", "wind_speed", "relative_humidity", "hotspot", "fwi"]}
+
+_LINK_DTYPES = {"bitrate_bps": "int32", "tx_power_dbm": "float32", "link_margin_db": "float32"}  # LINK_ADAPTATION
+
+SENSOR_TYPE = pd.CategoricalDtype(["typical", "universal"])  # fixed so per-step chunks concatenate
+
+# Log columns; x/y stay float64 (projected metres) and energy stays float64 (sums reach 1e12 mJ)
+LOG_DTYPES = {
+    "experiment": {"sensor_id": "int32", "sensor_type": SENSOR_TYPE, **_ENV_DTYPES},
+    "transmission": {
+        "sensor_id": "int32", "sensor_type": SENSOR_TYPE, "data_sent_bytes": "int32", "tx_time_sec": "float32",
+        "sampling_rate": "float32", "mac_attempts": "int8", **_ENV_DTYPES, **_LINK_DTYPES,
+    },
+    "kl_trace": {
+        "sensor_id": "int32", "sensor_type": SENSOR_TYPE, "data_sent_bytes": "float32", "tx_time_sec": "float32",
+        "sampling_rate": "float32", **_ENV_DTYPES, **_LINK_DTYPES,  # avg_kl stays float64 for exact replay
+    },
+}
+
+# Time columns are stored as datetime64[s]: int64 epoch seconds that still allow NaT and
+# write to CSV as plain datetimes, so existing readers parse them unchanged
+TIME_COLUMNS = {
+    "experiment": ["datetime"],
+    "transmission": ["timestamp"],
+    "kl_trace": ["datetime", "timestamp"],
+}
+
+
+def _cast(df, dtypes):
+    for column, dtype in dtypes.items():
+        if column not in df.columns:
+            continue
+        integer = not isinstance(dtype, pd.CategoricalDtype) and np.issubdtype(np.dtype(dtype), np.integer)
+        if integer and df[column].isna().any():
+            dtype = "float32"  # integers with gaps (e.g. no reading) can't be stored as int
+        df[column] = df[column].astype(dtype)
+    return df
+
+
+def epoch_seconds(values):
+    return pd.to_datetime(values).astype("datetime64[s]")
+
+
+def compact_simulation(df):
+    """Apply the compact dtypes to merged simulation data (in place and returned)."""
+    if not COMPACT_SCHEMA:
+        return df
+    df["datetime"] = epoch_seconds(df["datetime"])
+    return _cast(df, SIMULATION_DTYPES)
+
+
+def compact_log(df, kind):
+    """Compact one log table: narrow numeric types, categorical sensor_type, epoch-second times."""
+    if not COMPACT_SCHEMA:
+        return df
+    for column in TIME_COLUMNS[kind]:
+        if column in df.columns:
+            df[column] = epoch_seconds(df[column])
+    return _cast(df, LOG_DTYPES[kind])
+
+
+def read_log(path, kind, parse_times=True):
+    """Read a log CSV with the compact dtypes; time columns parsed to datetimes unless parse_times=False."""
+    df = pd.read_csv(path)
+    if COMPACT_SCHEMA:
+        df = _cast(df, LOG_DTYPES[kind])
+    for column in TIME_COLUMNS[kind]:
+        if parse_times and column in df.columns:
+            df[column] = epoch_seconds(df[column]) if COMPACT_SCHEMA else pd.to_datetime(df[column])
+    return df
+
+
+class LogBuffer:
+    """Log rows compacted one step at a time, so the run never holds a default-dtype copy.
+
+    Tracks what the same rows would take with pandas defaults for memory_report().
+    """
+
+    def __init__(self, kind):
+        self.kind = kind
+        self.chunks = []
+        self.rows = 0
+        self.default_mb = 0.0
+        self.compact_mb = 0.0
+
+    def extend(self, records):
+        if not records:
+            return
+        chunk = pd.DataFrame(records)
+        self.rows += len(chunk)
+        self.default_mb += memory_mb(chunk)
+        chunk = compact_log(chunk, self.kind)
+        self.compact_mb += memory_mb(chunk)
+        self.chunks.append(chunk)
+
+    def __bool__(self):
+        return self.rows > 0
+
+    def frame(self):
+        return pd.concat(self.chunks, ignore_index=True) if self.chunks else pd.DataFrame()
+
+    def sizes(self):
+        return self.rows, self.default_mb, self.compact_mb
+
+
+def memory_mb(df):
+    return df.memory_usage(deep=True).sum() / 1024**2
+
+
+def memory_report(sizes):
+    """Table of deep memory use from {name: (rows, default-dtype MB, compact MB)}."""
+    rows = [{"table": name, "rows": n, "default_mb": before, "compact_mb": after,
+             "ratio": after / before if before else np.nan}
+            for name, (n, before, after) in sizes.items()]
+    return pd.DataFrame(rows)
@@ -0,0 +1,268 @@
+import numpy as np
+import pandas as pd
+
+# Mergeable per-column summaries for data that does not fit in memory.
+# Every sketch supports update(values) on a chunk and merge(other), so chunks
+# (or processes) can be summarised independently and combined afterwards.
+
+QUANTILE_CAPACITY = 200_000  # values kept exactly before compaction starts
+DISTINCT_CAPACITY = 100_000  # distinct values counted exactly before falling back to HLL
+HLL_PRECISION = 14
+
+
+class MomentSketch:
+    """Count, min, max, mean and variance in one pass (Chan et al. merge)."""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = np.nan
+        self.max = np.nan
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return self
+        other = MomentSketch()
+        other.count = len(values)
+        other.mean = values.mean()
+        other.m2 = ((values - other.mean) ** 2).sum()
+        other.min = values.min()
+        other.max = values.max()
+        return self.merge(other)
+
+    def merge(self, other):
+        if other.count == 0:
+            return self
+        if self.count == 0:
+            self.__dict__.update(other.__dict__)
+            return self
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / total
+        self.m2 += other.m2 + delta**2 * self.count * other.count / total
+        self.count = total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def var(self, ddof=1):
+        return self.m2 / (self.count - ddof) if self.count > ddof else np.nan
+
+    def std(self, ddof=1):
+        return np.sqrt(self.var(ddof))
+
+
+class QuantileSketch:
+    """Exact quantiles up to QUANTILE_CAPACITY values, then a KLL-style compactor.
+
+    Level i holds items that each stand for 2**i original values; an overfull level
+    is sorted and every other item (random offset) is promoted to the next level.
+    """
+
+    def __init__(self, capacity=QUANTILE_CAPACITY, seed=0):
+        self.capacity = capacity
+        self.levels = [np.empty(0)]
+        self.rng = np.random.default_rng(seed)
+
+    @property
+    def exact(self):
+        return len(self.levels) == 1
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float)
+        self.levels[0] = np.concatenate([self.levels[0], values[~np.isnan(values)]])
+        self._compact()
+        return self
+
+    def merge(self, other):
+        for i, items in enumerate(other.levels):
+            if i == len(self.levels):
+                self.levels.append(np.empty(0))
+            self.levels[i] = np.concatenate([self.levels[i], items])
+        self._compact()
+        return self
+
+    def _compact(self):
+        level = 0
+        while level < len(self.levels):
+            # Deeper levels get smaller buffers, as in KLL
+            cap = max(64, int(self.capacity * (2 / 3) ** level))
+            if len(self.levels[level]) > cap:
+                items = np.sort(self.levels[level])
+                if len(items) % 2:
+                    items, keep = items[:-1], items[-1:]
+                else:
+                    keep = np.empty(0)
+                promoted = items[self.rng.integers(2)::2]
+                self.levels[level] = keep
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            level += 1
+
+    def quantile(self, q):
+        q = np.atleast_1d(q)
+        if self.exact:
+            if len(self.levels[0]) == 0:
+                return np.full(len(q), np.nan)
+            return np.quantile(self.levels[0], q)  # linear, like pandas
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(l), 2.0**i) for i, l in enumerate(self.levels)])
+        order = np.argsort(items)
+        items, cum = items[order], np.cumsum(weights[order])
+        return np.interp(q * cum[-1], cum - weights[order] / 2, items)
+
+
+class HyperLogLog:
+    def __init__(self, precision=HLL_PRECISION):
+        self.precision = precision
+        self.registers = np.zeros(2**precision, dtype=np.uint8)
+
+    def update(self, values):
+        hashes = pd.util.hash_array(np.asarray(values, dtype=object)).astype(np.uint64)
+        idx = (hashes >> np.uint64(64 - self.precision)).astype(np.int64)
+        rest = (hashes << np.uint64(self.precision)) | np.uint64(1 << (self.precision - 1))
+        # Rank = position of the first set bit in the remaining hash bits
+        rank = (64 - np.floor(np.log2(rest.astype(np.float64))).astype(np.int64)).astype(np.uint8)
+        np.maximum.at(self.registers, idx, rank)
+        return self
+
+    def merge(self, other):
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def estimate(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.sum(2.0 ** -self.registers.astype(float))
+        zeros = np.count_nonzero(self.registers == 0)
+        if raw <= 2.5 * m and zeros:
+            return m * np.log(m / zeros)  # linear counting for small cardinalities
+        return raw
+
+
+class FrequencySketch:
+    """Exact value counts until DISTINCT_CAPACITY, then heavy hitters plus HLL distinct count."""
+
+    def __init__(self, capacity=DISTINCT_CAPACITY):
+        self.capacity = capacity
+        self.counts = pd.Series(dtype="int64")
+        self.count = 0
+        self.truncated = False
+        self.hll = HyperLogLog()
+
+    def update(self, values):
+        values = pd.Series(values)
+        values = values[values.notna()]
+        if len(values) == 0:
+            return self
+        other = FrequencySketch(self.capacity)
+        other.counts = values.value_counts(sort=False)
+        other.count = len(values)
+        other.hll.update(values.to_numpy())
+        return self.merge(other)
+
+    def merge(self, other):
+        # groupby(sort=False) keeps first-seen order, which pandas uses to break count ties
+        self.counts = pd.concat([self.counts, other.counts]).groupby(level=0, sort=False).sum()
+        self.count += other.count
+        self.truncated |= other.truncated
+        self.hll.merge(other.hll)
+        if len(self.counts) > self.capacity:
+            self.counts = self.counts.sort_values(ascending=False, kind="stable").iloc[: self.capacity]
+            self.truncated = True
+        return self
+
+    def distinct(self):
+        return int(round(self.hll.estimate())) if self.truncated else len(self.counts)
+
+    def top(self):
+        if len(self.counts) == 0:
+            return np.nan, np.nan
+        counts = self.counts.sort_values(ascending=False, kind="stable")
+        return counts.index[0], int(counts.iloc[0])
+
+
+class ColumnSketch:
+    """Chooses the sketches matching how pandas' describe() treats the column dtype."""
+
+    def __init__(self, name):
+        self.name = name
+        self.kind = None
+        self.moments = MomentSketch()
+        self.quantiles = QuantileSketch()
+        self.frequencies = FrequencySketch()
+        self.tz = None
+
+    @staticmethod
+    def kind_of(series):
+        if pd.api.types.is_bool_dtype(series):
+            return "categorical"
+        if pd.api.types.is_numeric_dtype(series) or pd.api.types.is_timedelta64_dtype(series):
+            return "numeric"
+        if pd.api.types.is_datetime64_any_dtype(series):
+            return "datetime"
+        return "categorical"
+
+    def update(self, series):
+        kind = self.kind_of(series)
+        if self.kind is None:
+            self.kind = kind
+        elif kind != self.kind:
+            raise TypeError(f"Column {self.name} changed from {self.kind} to {kind} between chunks")
+
+        if kind == "categorical":
+            self.frequencies.update(series)
+            return self
+        if kind == "datetime":
+            self.tz = getattr(series.dt, "tz", None)
+            values = series.astype("datetime64[ns]" if self.tz is None else f"datetime64[ns, {self.tz}]")
+            values = values.dropna().astype("int64").to_numpy(dtype=float)
+        else:
+            values = series.to_numpy(dtype=float, na_value=np.nan)
+        self.moments.update(values)
+        self.quantiles.update(values)
+        return self
+
+    def merge(self, other):
+        if other.kind is None:
+            return self
+        self.kind = self.kind or other.kind
+        self.tz = self.tz or other.tz
+        self.moments.merge(other.moments)
+        self.quantiles.merge(other.quantiles)
+        self.frequencies.merge(other.frequencies)
+        return self
+
+    def describe(self, percentiles=(0.25, 0.5, 0.75)):
+        # Same index, values and dtype as Series.describe()
+        stats = ["count"]
+        labels = [f"{p:.0%}" for p in percentiles]
+        if self.kind in (None, "categorical"):
+            top, freq = self.frequencies.top()
+            distinct = self.frequencies.distinct()
+            return pd.Series(
+                [self.frequencies.count, distinct, top, freq],
+                index=["count", "unique", "top", "freq"],
+                name=self.name,
+                dtype=None if distinct > 0 else "object",
+            )
+
+        quantiles = list(self.quantiles.quantile(percentiles))
+        if self.kind == "datetime":
+            as_ts = lambda v: pd.Timestamp(int(v), tz=self.tz) if np.isfinite(v) else pd.NaT
+            return pd.Series(
+                [self.moments.count, as_ts(self.moments.mean), as_ts(self.moments.min)]
+                + [as_ts(q) for q in quantiles] + [as_ts(self.moments.max)],
+                index=stats + ["mean", "min"] + labels + ["max"],
+                name=self.name,
+            )
+        return pd.Series(
+            [self.moments.count, self.moments.mean, self.moments.std(), self.moments.min] + quantiles + [self.moments.max],
+            index=stats + ["mean", "std", "min"] + labels + ["max"],
+            name=self.name,
+            dtype="float64",
+        )
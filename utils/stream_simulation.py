@@ -0,0 +1,107 @@
+import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+from utils.schema import compact_simulation
+
+# Out-of-core access to fire_simulation_data: one ordered SQL query over the
+# GeoPackage, consumed in bounded chunks of whole timesteps.
+CHUNK_ROWS = int(os.getenv("SIM_CHUNK_ROWS", 500_000))  # rows fetched per chunk (at least one timestep)
+PREFETCH = os.getenv("SIM_PREFETCH", "1") != "0"  # read the next chunk on a background thread
+
+
+def window_bounds(con, layer, start, end):
+    """Raw datetime strings of the first and last timestep inside [start, end].
+
+    GeoPackage stores datetimes as ISO 8601 text, so string order is time order and
+    the bounds can be used directly in SQL.
+    """
+    raw = pd.read_sql_query(f'SELECT DISTINCT "datetime" FROM "{layer}"', con)["datetime"]
+    times = pd.Series(raw.to_numpy(), index=pd.to_datetime(raw)).sort_index()
+    times = times[(times.index >= start) & (times.index <= end)]
+    if times.empty:
+        return None
+    return times.iloc[0], times.iloc[-1]
+
+
+class ChunkReader:
+    """Time-ordered chunks of whole timesteps from an ordered cursor.
+
+    Rows of the last (possibly incomplete) timestep in a fetch are held back and
+    prepended to the next chunk, so every chunk holds complete timesteps.
+    """
+
+    def __init__(self, gpkg_path, layer, start, end, chunk_rows=CHUNK_ROWS):
+        # The cursor is only ever used by one thread at a time (the prefetcher)
+        self.con = sqlite3.connect(gpkg_path, check_same_thread=False)
+        self.chunk_rows = chunk_rows
+        self.cursor = None
+        self.columns = None
+        self.pending = None
+        bounds = window_bounds(self.con, layer, start, end)
+        if bounds is not None:
+            self.cursor = self.con.execute(
+                f'SELECT * FROM "{layer}" WHERE "datetime" >= ? AND "datetime" <= ? ORDER BY "datetime", "fid"',
+                bounds,
+            )
+            self.columns = [d[0] for d in self.cursor.description]
+
+    def next_chunk(self):
+        # Returns a DataFrame of complete timesteps, or None when the window is exhausted
+        while self.cursor is not None:
+            rows = self.cursor.fetchmany(self.chunk_rows)
+            fetched = pd.DataFrame.from_records(rows, columns=self.columns)
+            chunk = fetched if self.pending is None else pd.concat([self.pending, fetched], ignore_index=True)
+            if not rows:
+                self.cursor = None
+                self.pending = None
+                return chunk if not chunk.empty else None
+
+            last = chunk["datetime"].iloc[-1]
+            complete = chunk["datetime"] != last
+            self.pending = chunk[~complete]
+            if complete.any():
+                return chunk[complete].reset_index(drop=True)
+        return None
+
+    def close(self):
+        self.con.close()
+
+
+def prepare_chunk(grid, chunk):
+    # Same merge and typing as the in-memory load_simulation_data
+    chunk = chunk.drop(columns=["fid"], errors="ignore")
+    chunk["cell_id"] = chunk["cell_id"].astype(int)
+    sim_df = grid.merge(chunk, on="cell_id")
+    sim_df["datetime"] = pd.to_datetime(sim_df["datetime"])
+    return compact_simulation(sim_df)
+
+
+def stream_frames(gpkg_path, layer, grid, start, end, chunk_rows=CHUNK_ROWS, prefetch=PREFETCH):
+    """Yield one merged frame per timestep in [start, end], reading chunk by chunk.
+
+    At most the current chunk and the one being prefetched are in memory, whatever
+    the length of the event.
+    """
+    reader = ChunkReader(gpkg_path, layer, start, end, chunk_rows)
+
+    def load():
+        chunk = reader.next_chunk()
+        return None if chunk is None else prepare_chunk(grid, chunk)
+
+    executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+    try:
+        pending = executor.submit(load) if executor else None
+        while True:
+            sim_df = pending.result() if executor else load()
+            if sim_df is None:
+                return
+            if executor:
+                pending = executor.submit(load)  # overlaps with simulating this chunk
+            for ts in sorted(sim_df["datetime"].unique()):
+                yield sim_df[sim_df["datetime"] == ts]
+            del sim_df
+    finally:
+        if executor:
+            executor.shutdown(wait=True, cancel_futures=True)
+        reader.close()
@@ -0,0 +1,104 @@
+import os
+import numpy as np
+import pandas as pd
+
+# Cooperative suppression of redundant universal-sensor reports
+SUPPRESSION = os.getenv("SUPPRESSION", "0") == "1"
+SUPPRESSION_RADIUS_M = float(os.getenv("SUPPRESSION_RADIUS_M", 500))  # neighbours that overhear each other
+COORDINATION_ENERGY_MJ = float(os.getenv("COORDINATION_ENERGY_MJ", 0.2))  # listen window per candidate report
+# Readings within these tolerances (and with the same hotspot flag) count as equivalent
+EQUIVALENCE_TOLERANCE = {
+    "temperature": float(os.getenv("SUPPRESS_TEMPERATURE_TOL", 0.5)),
+    "wind_speed": float(os.getenv("SUPPRESS_WIND_SPEED_TOL", 1.0)),
+    "relative_humidity": float(os.getenv("SUPPRESS_HUMIDITY_TOL", 2.0)),
+}
+
+
+class NeighborSuppression:
+    """Drops a report when a neighbour already sent an equivalent one in the same step.
+
+    Neighbour lists are built once from the deployment with a KD-tree; within a step
+    candidates are considered in fleet order, so the first of a redundant group sends.
+    """
+
+    def __init__(self, xy, eligible, radius_m=SUPPRESSION_RADIUS_M, tolerance=EQUIVALENCE_TOLERANCE,
+                 overhead_mJ=COORDINATION_ENERGY_MJ):
+        from scipy.spatial import cKDTree
+
+        xy = np.asarray(xy, dtype=float)
+        eligible = np.asarray(eligible, dtype=bool)
+        self.variables = list(tolerance)
+        self.tolerance = np.array([tolerance[v] for v in self.variables])
+        self.overhead_mJ = overhead_mJ
+
+        # Neighbour lists (fleet positions) among eligible sensors only
+        positions = np.flatnonzero(eligible)
+        self.neighbors = {int(p): np.empty(0, dtype=np.int64) for p in positions}
+        if len(positions) > 1:
+            pairs = cKDTree(xy[positions]).query_pairs(radius_m, output_type="ndarray")
+            a, b = positions[pairs[:, 0]], positions[pairs[:, 1]]
+            both_a, both_b = np.r_[a, b], np.r_[b, a]
+            order = np.argsort(both_a, kind="stable")
+            both_a, both_b = both_a[order], both_b[order]
+            keys, starts = np.unique(both_a, return_index=True)
+            for key, group in zip(keys, np.split(both_b, starts[1:])):
+                self.neighbors[int(key)] = group
+
+        self._reported = np.full((len(xy), len(self.variables) + 1), np.nan)  # values + hotspot sent this step
+        self.stats = []
+
+    def apply(self, timestep, positions, transmissions):
+        """Return a keep flag per candidate transmission.
+
+        Every eligible candidate listens first (coordination_mJ). Kept reports are charged
+        for it by the caller once the MAC has priced their attempts (see listens()).
+        """
+        keep = np.ones(len(transmissions), dtype=bool)
+        sent = []
+        saved_bytes = saved_mJ = overhead_mJ = 0.0
+        hot_suppressed = candidates = 0
+
+        for k, (pos, tx) in enumerate(zip(positions, transmissions)):
+            nb = self.neighbors.get(int(pos))
+            if nb is None:
+                continue  # not a suppressing sensor type
+            candidates += 1
+            obs = np.array([np.nan if tx.get(v) is None else tx[v] for v in self.variables] + [tx.get("hotspot")],
+                           dtype=float)
+            heard = self._reported[nb]
+            equivalent = (np.abs(heard[:, :-1] - obs[:-1]) <= self.tolerance).all(axis=1) & (heard[:, -1] == obs[-1])
+
+            overhead_mJ += self.overhead_mJ
+            if equivalent.any():
+                keep[k] = False
+                saved_bytes += tx["data_sent_bytes"]
+                saved_mJ += tx["energy_used_mJ"]
+                hot_suppressed += obs[-1] == 1
+            else:
+                self._reported[pos] = obs
+                sent.append(pos)
+
+        self._reported[sent] = np.nan
+        self.stats.append({
+            "datetime": timestep,
+            "candidates": candidates,
+            "suppressed": int((~keep).sum()),
+            "bytes_saved": saved_bytes,
+            "energy_saved_mJ": saved_mJ,
+            "coordination_mJ": overhead_mJ,
+            "hotspot_reports_suppressed": int(hot_suppressed),
+        })
+        return keep
+
+    def listens(self, position):
+        # Whether the sensor at this fleet position takes part in suppression
+        return int(position) in self.neighbors
+
+    def table(self):
+        return pd.DataFrame(self.stats)
+
+    def save(self, output_dir):
+        os.makedirs(output_dir, exist_ok=True)
+        path = os.path.join(output_dir, "suppression.csv")
+        self.table().to_csv(path, index=False)
+        return {"suppression": path}
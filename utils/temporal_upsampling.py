@@ -0,0 +1,49 @@
+import os
+from itertools import chain
+import numpy as np
+import pandas as pd
+
+# Sub-hourly steps between the hourly simulation frames
+SUBSTEPS_PER_HOUR = int(os.getenv("SUBSTEPS_PER_HOUR", 1))  # 1 = the original hourly frames
+CONTINUOUS_VARS = ["temperature", "wind_speed", "relative_humidity", "fwi"]  # interpolated linearly
+# hotspot (and any other column) is carried forward from the earlier frame
+
+
+def interpolate_frames(frame, next_frame, substeps):
+    """Yield (time, frame) for frame itself and substeps - 1 blends towards next_frame.
+
+    Cells are matched on cell_id; a cell missing from next_frame keeps its values.
+    With no next frame (end of the window) only frame itself is produced.
+    """
+    t0 = pd.Timestamp(frame["datetime"].iloc[0])
+    yield t0, frame
+    if next_frame is None or substeps <= 1:
+        return
+
+    t1 = pd.Timestamp(next_frame["datetime"].iloc[0])
+    start = frame[CONTINUOUS_VARS].to_numpy(dtype=float)
+    target = next_frame.set_index("cell_id")[CONTINUOUS_VARS].reindex(frame["cell_id"]).to_numpy(dtype=float)
+    delta = np.where(np.isnan(target), 0.0, target - start)
+
+    for k in range(1, substeps):
+        t = t0 + (t1 - t0) * k / substeps
+        sub = frame.copy()
+        sub[CONTINUOUS_VARS] = start + delta * (k / substeps)
+        sub["datetime"] = t
+        yield t, sub
+
+
+def upsampled_frames(frames, substeps=SUBSTEPS_PER_HOUR):
+    """Lazily yield (time, frame) for every step, substeps per source frame.
+
+    frames is any time-ordered iterable of per-timestep frames (in-memory or
+    streamed); only the current and next ones are held at once, and sub-steps are
+    built as they are consumed.
+    """
+    frames = iter(frames)
+    current = next(frames, None)
+    if current is None:
+        return
+    for following in chain(frames, [None]):
+        yield from interpolate_frames(current, following, substeps)
+        current = following
@@ -0,0 +1,110 @@
+import hashlib
+import os
+import numpy as np
+import pandas as pd
+
+# Terrain-aware propagation: knife-edge diffraction over the grid's elevation along
+# each sensor-to-base link. Sensors and the base are static, so the loss of every link
+# is computed once (vectorized over links) and cached; transmissions only add it.
+TERRAIN_PATH_LOSS = os.getenv("TERRAIN_PATH_LOSS", "0") == "1"
+TERRAIN_SAMPLES = max(3, int(os.getenv("TERRAIN_SAMPLES", 128)))  # profile points per link, ends included
+TERRAIN_RESOLUTION_M = float(os.getenv("TERRAIN_RESOLUTION_M", 0))  # elevation raster pixel; 0: half a cell
+FREQUENCY_MHZ = float(os.getenv("FREQUENCY_MHZ", 915))
+SENSOR_ANTENNA_M = float(os.getenv("SENSOR_ANTENNA_M", 2))
+BASE_ANTENNA_M = float(os.getenv("BASE_ANTENNA_M", 10))
+TERRAIN_CACHE_DIR = os.getenv("TERRAIN_CACHE_DIR", "results/terrain_cache")
+EFFECTIVE_EARTH_RADIUS_M = 4 / 3 * 6_371_000  # standard refraction (k = 4/3)
+SPEED_OF_LIGHT = 299_792_458.0
+
+
+def knife_edge_loss_db(nu):
+    """ITU-R P.526 approximation of single knife-edge diffraction loss J(nu)."""
+    nu = np.asarray(nu, dtype=float)
+    loss = 6.9 + 20 * np.log10(np.sqrt((nu - 0.1) ** 2 + 1) + nu - 0.1)
+    return np.where(nu > -0.78, loss, 0.0)
+
+
+def elevation_raster(grid, resolution_m=TERRAIN_RESOLUTION_M):
+    """(CellRaster, per-pixel elevation with NaN outside the grid)."""
+    from utils.rasterize import CellRaster
+
+    if resolution_m <= 0:
+        resolution_m = np.sqrt(np.median(grid.geometry.area)) / 2
+    raster = CellRaster.from_grid(grid, resolution_m)
+    elevation = np.append(grid["elevation"].to_numpy(dtype=float), np.nan)[raster.index]
+    return raster, elevation
+
+
+def sample_elevation(raster, elevation, x, y):
+    row, col = raster.to_pixels(x, y)
+    inside = (row >= 0) & (row < raster.height) & (col >= 0) & (col < raster.width)
+    values = np.full(np.shape(x), np.nan)
+    values[inside] = elevation[row[inside], col[inside]]
+    return values
+
+
+def link_profiles(raster, elevation, xy, base_xy, samples=TERRAIN_SAMPLES):
+    """Terrain heights at samples evenly spaced points on every link (links x samples), end points included."""
+    xy = np.asarray(xy, dtype=float)
+    t = np.linspace(0.0, 1.0, samples)
+    px = xy[:, :1] + (base_xy[0] - xy[:, :1]) * t
+    py = xy[:, 1:] + (base_xy[1] - xy[:, 1:]) * t
+    return sample_elevation(raster, elevation, px, py), t
+
+
+def diffraction_loss(profiles, t, distance_m, sensor_height_m=SENSOR_ANTENNA_M, base_height_m=BASE_ANTENNA_M,
+                     frequency_mhz=FREQUENCY_MHZ):
+    """Dominant knife-edge (largest Fresnel-Kirchhoff parameter) on each link.
+
+    Returns (nu, obstruction_m, loss_db) per link; terrain outside the grid does not obstruct.
+    """
+    wavelength = SPEED_OF_LIGHT / (frequency_mhz * 1e6)
+    ends = np.nan_to_num(profiles[:, [0, -1]], nan=np.nanmean(profiles) if np.isfinite(profiles).any() else 0.0)
+    tx = ends[:, :1] + sensor_height_m
+    rx = ends[:, 1:] + base_height_m
+
+    d = np.asarray(distance_m, dtype=float)[:, None]
+    d1 = d * t[1:-1]
+    d2 = d - d1
+    sight_line = tx + (rx - tx) * t[1:-1]
+    bulge = d1 * d2 / (2 * EFFECTIVE_EARTH_RADIUS_M)
+    clearance = profiles[:, 1:-1] + bulge - sight_line  # > 0: terrain above the line of sight
+    with np.errstate(divide="ignore", invalid="ignore"):
+        nu = clearance * np.sqrt(2 * d / (wavelength * d1 * d2))
+    nu = np.where(np.isfinite(nu), nu, -np.inf)
+
+    worst = nu.argmax(axis=1)
+    links = np.arange(len(d))
+    return nu[links, worst], clearance[links, worst], knife_edge_loss_db(nu[links, worst])
+
+
+def _cache_key(xy, base_xy, grid, params):
+    digest = hashlib.sha256()
+    digest.update(np.ascontiguousarray(xy, dtype=float).tobytes())
+    digest.update(np.asarray(base_xy, dtype=float).tobytes())
+    digest.update(np.ascontiguousarray(grid.geometry.bounds.to_numpy(dtype=float)).tobytes())
+    digest.update(grid["elevation"].to_numpy(dtype=float).tobytes())
+    digest.update(repr(params).encode())
+    return digest.hexdigest()
+
+
+def terrain_link_loss(xy, base_xy, grid, cache_dir=TERRAIN_CACHE_DIR):
+    """Per-link diffraction table for sensors at xy talking to base_xy, cached by deployment and grid."""
+    xy = np.asarray(xy, dtype=float).reshape(-1, 2)
+    params = (TERRAIN_SAMPLES, TERRAIN_RESOLUTION_M, FREQUENCY_MHZ, SENSOR_ANTENNA_M, BASE_ANTENNA_M)
+    path = os.path.join(cache_dir, f"{_cache_key(xy, base_xy, grid, params)}.csv")
+    if os.path.exists(path):
+        return pd.read_csv(path)
+
+    raster, elevation = elevation_raster(grid)
+    profiles, t = link_profiles(raster, elevation, xy, base_xy)
+    distance = np.hypot(xy[:, 0] - base_xy[0], xy[:, 1] - base_xy[1])
+    nu, obstruction, loss = diffraction_loss(profiles, t, distance)
+    table = pd.DataFrame({
+        "x": xy[:, 0], "y": xy[:, 1], "distance_m": distance,
+        "sensor_elevation_m": profiles[:, 0], "base_elevation_m": profiles[:, -1],
+        "max_obstruction_m": obstruction, "fresnel_nu": nu, "diffraction_loss_db": loss,
+    })
+    os.makedirs(cache_dir, exist_ok=True)
+    table.to_csv(path, index=False)
+    return table
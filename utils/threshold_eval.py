@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+from utils.schema import read_log
+
+# Evaluates many KL transmit thresholds from one simulation run.
+# should_transmit() does not feed back into prediction, sampling or error history,
+# and transmit() builds its candidate record for every reading, so the run's
+# kl_trace holds exactly what any threshold would have sent - unless a fleet-level
+# model reacts to what was sent (see threshold_feedback()).
+
+KL_TRACE_CSV = "results/kl_trace_universal.csv"
+
+TRANSMISSION_COLUMNS = [
+    "sensor_id", "timestamp", "data_sent_bytes", "tx_time_sec", "energy_used_mJ", "x", "y",
+    "sampling_rate", "temperature", "wind_speed", "relative_humidity", "hotspot", "fwi", "sensor_type",
+]
+
+
+def load_kl_trace(path=KL_TRACE_CSV):
+    return read_log(path, "kl_trace")
+
+
+def threshold_feedback():
+    """Enabled models through which the threshold changes more than what is sent.
+
+    Batteries drain faster and retire sensors, MAC collisions and retries depend on the
+    load, and suppression depends on what neighbours sent; with any of them on, each
+    threshold needs its own run.
+    """
+    from utils.battery import BATTERY_CAPACITY_J
+    from utils.mac import MAC_MODE
+    from utils.suppression import SUPPRESSION
+
+    return [name for name, enabled in [("BATTERY_CAPACITY_J", BATTERY_CAPACITY_J > 0),
+                                       ("MAC_MODE", MAC_MODE != "none"), ("SUPPRESSION", SUPPRESSION)] if enabled]
+
+
+def _delivered(trace):
+    # Packets lost on a shared channel don't reach the base; rows never sent count as deliverable
+    if "mac_delivered" not in trace:
+        return np.ones(len(trace), dtype=bool)
+    return trace["mac_delivered"].fillna(True).astype(bool).to_numpy()
+
+
+def evaluate_thresholds(trace, thresholds):
+    """Transmissions, data, energy, sampling rate and hotspot recovery for each threshold.
+
+    One sort plus suffix sums answers every threshold with a searchsorted lookup.
+    """
+    kl = trace["avg_kl"].to_numpy(dtype=float)
+    kl = np.where(np.isnan(kl), -np.inf, kl)  # no prediction yet: never transmitted
+    order = np.argsort(kl, kind="stable")
+    kl = kl[order]
+
+    def suffix_sums(column):
+        values = np.nan_to_num(trace[column].to_numpy(dtype=float)[order])
+        return np.r_[np.cumsum(values[::-1])[::-1], 0.0]
+
+    energy = suffix_sums("energy_used_mJ")
+    data = suffix_sums("data_sent_bytes")
+    sampling = suffix_sums("sampling_rate")
+    hot = (trace["hotspot"].to_numpy() == 1)[order]
+    hot_delivered = (hot & _delivered(trace)[order]).astype(float)
+    hot_sent = np.r_[np.cumsum(hot_delivered[::-1])[::-1], 0.0]
+    hot_total = hot.sum()
+
+    # Transmit iff avg_kl > threshold, i.e. everything right of the last value <= threshold
+    first = np.searchsorted(kl, np.asarray(thresholds, dtype=float), side="right")
+    sent = len(kl) - first
+    return pd.DataFrame({
+        "kl_threshold": thresholds,
+        "transmissions": sent,
+        "data_kb": data[first] / 1024,
+        "energy_j": energy[first] / 1000,
+        "avg_sampling_rate": np.divide(sampling[first], sent, out=np.full(len(sent), np.nan), where=sent > 0),
+        "hotspot_recovery_rate": hot_sent[first] / hot_total if hot_total > 0 else 0.0,
+    })
+
+
+def transmission_log_for_threshold(trace, threshold):
+    # Same schema as the live run's transmission log, for the readings this threshold gets to the base
+    sent = trace[(trace["avg_kl"] > threshold) & _delivered(trace)]
+    return sent[[c for c in TRANSMISSION_COLUMNS if c in sent.columns]].reset_index(drop=True)
@@ -1,5 +1,6 @@
 import pandas as pd
 import os
+from utils.schema import read_log
 
 # Paths
 TX_PATH = "results/transmission_log_combined_FINAL.csv"
@@ -9,8 +10,8 @@ OUTPUT_PATH = "results/tables/final_transmission_metrics.csv"
 os.makedirs("results/tables", exist_ok=True)
 
 # Load logs
-tx = pd.read_csv(TX_PATH, parse_dates=["timestamp"])
-exp = pd.read_csv(EXP_PATH, parse_dates=["datetime"])
+tx = read_log(TX_PATH, "transmission")
+exp = read_log(EXP_PATH, "experiment")
 
 # Prepare result dictionary
 metrics = {
@@ -4,6 +4,9 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 from scipy.stats import pearsonr
 import os
+from utils.detection_latency import load_hotspot_onsets, detection_latency, summarize_latency
+from utils.schema import read_log
+from utils.log_stats import binned_kde, box_stats, mean_ci95, sample_values, STATS_SAMPLE_ROWS
 
 # CONFIG
 sns.set_context("talk")  # Large font sizes
@@ -20,36 +23,27 @@ os.makedirs("results/figures", exist_ok=True)
 os.makedirs("results/tables", exist_ok=True)
 
 # Load logs
-exp = pd.read_csv("results/experiment_log_combined.csv", parse_dates=["datetime"])
-tx = pd.read_csv("results/transmission_log_combined.csv", parse_dates=["timestamp"])
+exp = read_log("results/experiment_log_combined.csv", "experiment")
+tx = read_log("results/transmission_log_combined.csv", "transmission")
 
 # Filter for universal sensors only
 exp = exp[exp["sensor_type"] == "universal"]
 tx = tx[tx["sensor_type"] == "universal"]
 
-# Merge key for alignment
-exp["key"] = exp["sensor_id"].astype(str) + "_" + exp["datetime"].astype(str)
-tx["key"] = tx["sensor_id"].astype(str) + "_" + tx["timestamp"].astype(str)
-exp["transmitted"] = exp["key"].isin(tx["key"])
+# Align readings with transmissions on (sensor, time)
+tx_keys = pd.MultiIndex.from_arrays([tx["sensor_id"], tx["timestamp"]])
+exp["transmitted"] = pd.MultiIndex.from_arrays([exp["sensor_id"], exp["datetime"]]).isin(tx_keys)
 
 # Descriptive Stats
 desc = exp.groupby("transmitted")[["temperature", "wind_speed", "relative_humidity"]].agg(["mean", "median", "std", "min", "max"])
 desc.columns = ['_'.join(col) for col in desc.columns]
 desc.to_csv("results/tables/descriptive_stats.csv")
 
-# 95% Confidence Intervals
-def ci95(series):
-    n = len(series)
-    if n == 0:
-        return np.nan, np.nan
-    mean = series.mean()
-    margin = 1.96 * series.std(ddof=1) / np.sqrt(n)
-    return mean - margin, mean + margin
-
+# 95% Confidence Intervals (one pass of moments per group)
 ci_data = []
 for var in ["temperature", "wind_speed", "relative_humidity"]:
     for label, group in exp.groupby("transmitted"):
-        lower, upper = ci95(group[var])
+        lower, upper = mean_ci95(group[var])
         ci_data.append({
             "variable": var,
             "transmitted": label,
@@ -68,21 +62,21 @@ corr.to_csv("results/tables/pearson_correlation.csv")
 # Add human-readable label
 exp["transmit_label"] = exp["transmitted"].map({True: "Transmitted", False: "Retained Only"})
 
+# Figures are drawn from binned statistics, so their cost stays flat as logs grow;
+# STATS_SAMPLE_ROWS > 0 additionally caps the rows used per group
+def figure_values(label, var):
+    return sample_values(exp.loc[exp["transmit_label"] == label, var].to_numpy(dtype=float), STATS_SAMPLE_ROWS)
+
 # KDE plots
 for var in ["temperature", "wind_speed", "relative_humidity"]:
     plt.figure(figsize=(10, 6))
     for label, color in zip(["Transmitted", "Retained Only"], ["blue", "orange"]):
-        subset = exp[exp["transmit_label"] == label]
-        if not subset.empty:
-            sns.kdeplot(
-                data=subset,
-                x=var,
-                fill=True,
-                common_norm=False,
-                alpha=0.5,
-                label=label,
-                color=color
-            )
+        kde = binned_kde(figure_values(label, var))
+        if kde is not None:
+            support, density = kde
+            plt.fill_between(support, density, alpha=0.5, color=color, label=label)
+            plt.plot(support, density, color=color)
+    plt.ylim(bottom=0)
     plt.title(f"KDE of {var.replace('_', ' ').title()} (Transmitted vs Retained)")
     plt.xlabel(var.replace("_", " ").title())
     plt.ylabel("Density")
@@ -94,7 +88,10 @@ for var in ["temperature", "wind_speed", "relative_humidity"]:
 # Box plots
 for var in ["temperature", "wind_speed", "relative_humidity"]:
     plt.figure(figsize=(10, 6))
-    sns.boxplot(data=exp, x="transmit_label", y=var)
+    stats = [box_stats(figure_values(label, var), label) for label in exp["transmit_label"].unique()]
+    plt.gca().bxp(stats, patch_artist=True, widths=0.8,
+                  boxprops={"facecolor": sns.desaturate(sns.color_palette()[0], 0.75)},
+                  medianprops={"color": "0.2"}, flierprops={"marker": "d", "markerfacecolor": "0.2"})
     plt.title(f"Box Plot of {var.replace('_', ' ').title()}")
     plt.xlabel("Data Type")
     plt.ylabel(var.replace("_", " ").title())
@@ -132,6 +129,23 @@ plt.tight_layout()
 plt.savefig("results/figures/hotspot_coverage.png", dpi=300)
 plt.close()
 
+# Detection latency: first universal transmission near each hotspot onset
+sensor_df = pd.read_csv("results/sensor_deployment.csv")
+universal_sensors = sensor_df[sensor_df["sensor_type"] == "universal"]
+onsets = load_hotspot_onsets(exp["datetime"].min(), exp["datetime"].max())
+latency_df = detection_latency(onsets, universal_sensors, tx)
+latency_df.to_csv("results/tables/detection_latency.csv", index=False)
+pd.DataFrame([summarize_latency(latency_df)]).to_csv("results/tables/detection_latency_summary.csv", index=False)
+
+plt.figure(figsize=(8, 6))
+sns.histplot(latency_df["latency_h"].dropna(), discrete=True)
+plt.title("Hotspot Detection Latency")
+plt.xlabel("Latency (hours)")
+plt.ylabel("Onsets")
+plt.tight_layout()
+plt.savefig("results/figures/detection_latency_histogram.png", dpi=300)
+plt.close()
+
 # Sampling rate over time
 sampling_stats = tx.groupby("timestamp")["sampling_rate"].mean().reset_index()
 sampling_stats.columns = ["timestamp", "avg_sampling_rate"]
@@ -149,7 +163,12 @@ plt.close()
 
 # Histogram of sampling rates
 plt.figure(figsize=(8, 6))
-sns.histplot(tx["sampling_rate"], bins=20, kde=True)
+rates = tx["sampling_rate"].dropna().to_numpy(dtype=float)
+counts, edges = np.histogram(rates, bins=20)
+plt.bar(edges[:-1], counts, width=np.diff(edges), align="edge", alpha=0.5, edgecolor="black")
+kde = binned_kde(sample_values(rates, STATS_SAMPLE_ROWS), cut=0)  # histplot's kde=True, scaled to counts
+if kde is not None:
+    plt.plot(kde[0], kde[1] * len(rates) * np.diff(edges)[0])
 plt.title("Distribution of Sampling Rates")
 plt.xlabel("Sampling Rate")
 plt.ylabel("Frequency")
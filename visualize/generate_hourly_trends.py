@@ -2,13 +2,14 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 import os
+from utils.schema import read_log
 
 # Ensure output directory exists
 os.makedirs("results/figures", exist_ok=True)
 
 # Load experiment and transmission logs
-exp_log = pd.read_csv("results/experiment_log_combined.csv", parse_dates=["datetime"])
-tx_log = pd.read_csv("results/transmission_log_combined.csv", parse_dates=["timestamp"])
+exp_log = read_log("results/experiment_log_combined.csv", "experiment")
+tx_log = read_log("results/transmission_log_combined.csv", "transmission")
 
 # Filter for universal sensors only
 exp_log = exp_log[exp_log["sensor_type"] == "universal"]
@@ -22,7 +23,7 @@ tx_log["key"] = tx_log["sensor_id"].astype(str) + "_" + tx_log["timestamp"].asty
 exp_log["transmitted"] = exp_log["key"].isin(tx_log["key"])
 
 # Extract hour for grouping
-exp_log["hour"] = exp_log["datetime"].dt.floor("H")
+exp_log["hour"] = exp_log["datetime"].dt.floor("h")
 
 # Plot hourly trends for each variable
 # Plot hourly trends for each variable
@@ -1,5 +1,4 @@
 import pandas as pd
-import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
 import os
@@ -17,50 +16,15 @@ plt.rcParams.update({
 
 os.makedirs("results/figures", exist_ok=True)
 
-# Load logs
-tx_df = pd.read_csv("results/transmission_log_combined.csv")
-sensor_df = pd.read_csv("results/sensor_deployment.csv")
-
-# Add sensor_id based on row number
-# Add sensor_id to sensor_df
-sensor_df["sensor_id"] = sensor_df.index
-
-# Create a matching key for merge
-sensor_df["sensor_key"] = (
-    sensor_df["x"].round(3).astype(str) + "_" +
-    sensor_df["y"].round(3).astype(str) + "_" +
-    sensor_df["sensor_type"]
-)
-tx_df["sensor_key"] = (
-    tx_df["x"].round(3).astype(str) + "_" +
-    tx_df["y"].round(3).astype(str) + "_" +
-    tx_df["sensor_type"]
-)
-
-# Merge sensor_id and coordinates
-tx_df = tx_df.merge(sensor_df[["sensor_key", "sensor_id"]], on="sensor_key", how="left")
-
-# Merge distance into transmission log
-sensor_coords = sensor_df[["sensor_id", "sensor_type", "x", "y"]]
-tx_df = tx_df.merge(sensor_coords, on=["x", "y", "sensor_type"], how="left")
-
-# Calculate distance from base station
-# Define base station as center of deployed sensor region
-base_x = sensor_df["x"].mean()
-base_y = sensor_df["y"].mean()
-
-tx_df["distance_km"] = np.sqrt((tx_df["x"] - base_x)**2 + (tx_df["y"] - base_y)**2) / 1000
-
-# Aggregate metrics per sensor
-agg = tx_df.groupby(["sensor_id", "sensor_type", "distance_km"]).agg({
-    "energy_used_mJ": "mean",
-    "data_sent_bytes": "mean"
-}).reset_index()
+# Per-sensor means and distances come from the simulation's online metric summary,
+# so the transmission log does not need to be read back
+agg = pd.read_csv("results/metrics/summary_by_sensor.csv")
+agg = agg[agg["transmissions"] > 0][["sensor_id", "sensor_type", "distance_km", "avg_energy_per_tx_mJ", "avg_tx_bytes"]]
 
 # Rename for clarity
 agg.rename(columns={
-    "energy_used_mJ": "Avg Energy per Tx (mJ)",
-    "data_sent_bytes": "Avg Tx Size (bytes)"
+    "avg_energy_per_tx_mJ": "Avg Energy per Tx (mJ)",
+    "avg_tx_bytes": "Avg Tx Size (bytes)"
 }, inplace=True)
 
 # ---------------------------